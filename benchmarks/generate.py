@@ -0,0 +1,154 @@
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# The most rows an excel sheet can hold, below the headings
+XLSX_MAX_ROWS = 1048575
+
+# Values which fail the validation of each column in the default configuration
+INVALID_VALUES = {
+    "DATE": ["2021-05-01", "31/02/2021", "not a date"],
+    "PONUM": ["ABC", "N/A"],
+    "POLINE": ["A", "1-2"],
+    "SUPPLIER": ["123", "-"],
+    "MPC": ["ABC", "N/A"],
+    "DESC": [None],
+    "eCLASS": ["XXX", "999"],
+    "PRICE": ["0", "0.01", "1", "abc"],
+    "QTY": ["-1", "0", "none"],
+    "TOTAL": ["abc", "N/A"],
+    "UOM": ["Box/10", "£5"],
+    "COSTCENTRE": [None],
+    "CONTRACTREF": [None],
+}
+
+UOM_VALUES = ["Each", "Box", "Box 10", "Pack of 5", "5", "Case 12", "EA", "Box 100"]
+
+
+def make_pool(rng, prefix, cardinality, digits=6):
+    """
+    Creates a list of distinct codes to choose values from
+    :prefix: the letters at the start of each code
+    :cardinality: the number of distinct codes
+    :returns: numpy array of strings
+    """
+    numbers = rng.choice(10**digits, size=min(cardinality, 10**digits), replace=False)
+    return np.array([f"{prefix}{n:0{digits}d}" for n in numbers], dtype=object)
+
+
+def generate_supplier_data(
+    rows,
+    null_rate=0.01,
+    invalid_rate=0.02,
+    cardinality=1000,
+    start=datetime.date(2021, 5, 1),
+    end=datetime.date(2021, 5, 31),
+    seed=0,
+):
+    """
+    Creates a dataframe of supplier data, with the columns of the default
+    configuration. Values are stored as strings, as they would be read from a file.
+
+    :rows: the number of rows
+    :null_rate: (optional) the proportion of values in each column which are missing
+    :invalid_rate: (optional) the proportion of values in each column which fail
+        its validation
+    :cardinality: (optional) the number of distinct values in the text columns
+    :start: (optional) the earliest date in the data
+    :end: (optional) the latest date in the data
+    :seed: (optional) seed for the random numbers, so the data can be recreated
+    :returns: dataframe
+    """
+    rng = np.random.default_rng(seed)
+
+    dates = pd.date_range(start, end).strftime("%d/%m/%Y").to_numpy(dtype=object)
+    suppliers = np.array(
+        [f"Supplier {chr(65 + i % 26)}{i}" for i in range(cardinality)], dtype=object
+    )
+    prices = rng.integers(2, 100000, size=rows) / 100
+    qtys = rng.integers(1, 50, size=rows)
+
+    data = pd.DataFrame(
+        {
+            "DATE": rng.choice(dates, rows),
+            "PONUM": rng.choice(make_pool(rng, "PO", cardinality), rows),
+            "POLINE": rng.integers(1, 20, size=rows).astype(str).astype(object),
+            "SUPPLIER": rng.choice(suppliers, rows),
+            "MPC": rng.choice(make_pool(rng, "MPC", cardinality), rows),
+            "DESC": rng.choice(make_pool(rng, "Item ", cardinality), rows),
+            "eCLASS": rng.choice(np.array(["ABC", "ABA", "000"], dtype=object), rows),
+            "PRICE": np.char.mod("%.2f", prices).astype(object),
+            "QTY": qtys.astype(str).astype(object),
+            "TOTAL": np.char.mod("%.2f", prices * qtys).astype(object),
+            "UOM": rng.choice(np.array(UOM_VALUES, dtype=object), rows),
+            "COSTCENTRE": rng.choice(make_pool(rng, "CC", min(cardinality, 100)), rows),
+            "CONTRACTREF": rng.choice(
+                make_pool(rng, "CON", min(cardinality, 50)), rows
+            ),
+        }
+    )
+
+    for column, invalid_values in INVALID_VALUES.items():
+        values = data[column].to_numpy()
+        invalid = rng.random(rows) < invalid_rate
+        values[invalid] = rng.choice(
+            np.array(invalid_values, dtype=object), invalid.sum()
+        )
+        values[rng.random(rows) < null_rate] = None
+        data[column] = values
+
+    return data
+
+
+def write_supplier_file(data, directory, filetype="csv", supplier="XXX"):
+    """
+    Writes supplier data to a file named so it passes the filename checks
+    :data: dataframe from generate_supplier_data
+    :directory: the folder to write to
+    :filetype: (optional) "csv" or "xlsx"
+    :supplier: (optional) the three letter code at the start of the filename
+    :returns: pathlib.Path of the file
+    """
+    if filetype == "xlsx" and len(data) > XLSX_MAX_ROWS:
+        raise ValueError(f"Excel files can't have more than {XLSX_MAX_ROWS} rows")
+
+    dates = pd.to_datetime(data["DATE"], format="%d/%m/%Y", errors="coerce")
+    name = (
+        f"{supplier}_{dates.min().replace(day=1):%d%m%y}"
+        f"_{(dates.max() + pd.offsets.MonthEnd(0)):%d%m%y}.{filetype}"
+    )
+    path = Path(directory) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if filetype == "csv":
+        data.to_csv(path, index=False)
+    else:
+        data.to_excel(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create synthetic supplier files.")
+    parser.add_argument("rows", type=int, nargs="+")
+    parser.add_argument("--directory", default="data")
+    parser.add_argument("--filetype", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--null-rate", type=float, default=0.01)
+    parser.add_argument("--invalid-rate", type=float, default=0.02)
+    parser.add_argument("--cardinality", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        data = generate_supplier_data(
+            rows,
+            null_rate=args.null_rate,
+            invalid_rate=args.invalid_rate,
+            cardinality=args.cardinality,
+            seed=args.seed,
+        )
+        path = write_supplier_file(
+            data, Path(args.directory) / str(rows), args.filetype
+        )
+        print(f"Written {rows} rows to {path}")
@@ -0,0 +1,421 @@
+import argparse
+import copy
+import datetime
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import first_package
+from first_package import (
+    SourceFile,
+    apply_transformation_from_config,
+    apply_validation_from_config,
+    compile_config,
+    update_default_config,
+)
+from first_package.stats import function_name
+from first_package.transformations import (
+    calculate_total,
+    calculate_total_series,
+    get_numeric,
+    get_numeric_series,
+    identify_uom,
+    identify_uom_series,
+    remove_vat,
+    remove_vat_series,
+    strip_whitespace,
+    strip_whitespace_series,
+)
+from first_package.validators import (
+    SERIES_VALIDATORS,
+    check_empty,
+    check_eclass,
+    check_total,
+    check_total_series,
+    contains_only_digit_period,
+    find_invalid,
+    find_rule_invalid,
+    must_be_alphanumeric_space_period,
+    must_be_numeric,
+    must_be_positive,
+    must_be_valid_date_in_ddmmyyyy,
+    must_contain_digit,
+    must_contain_letter,
+    not_zero_pound_penny,
+)
+from generate import XLSX_MAX_ROWS, generate_supplier_data, write_supplier_file
+
+# Use the configuration from the example
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "example"))
+from configuration import default_config  # noqa: E402
+from custom_configuration import custom_config  # noqa: E402
+
+# The columns of the example dagster pipeline, from the supplier columns
+DAGSTER_COLUMNS = {"PRICE": "price", "QTY": "qty", "MPC": "code", "UOM": "uom"}
+
+# The columns of the generated data each validator is timed on
+VALIDATOR_COLUMNS = {
+    check_empty: ["DESC"],
+    must_be_valid_date_in_ddmmyyyy: ["DATE"],
+    must_contain_digit: ["MPC"],
+    must_contain_letter: ["SUPPLIER"],
+    must_be_numeric: ["PRICE"],
+    must_be_alphanumeric_space_period: ["DESC"],
+    not_zero_pound_penny: ["PRICE"],
+    must_be_positive: ["QTY"],
+    check_eclass: ["eCLASS"],
+    contains_only_digit_period: ["TOTAL"],
+}
+
+# The cell and series versions of each validator, and the columns they take
+VALIDATORS = [
+    (function, series_function, VALIDATOR_COLUMNS[function])
+    for function, series_function in SERIES_VALIDATORS.items()
+] + [(check_total, check_total_series, ["PRICE", "QTY", "TOTAL"])]
+
+# The cell and series versions of each transformation, and the columns they
+# take. identify_uom_series remembers the UOMs it has seen, as it does
+# between files, so it's timed with them already known.
+TRANSFORMATIONS = [
+    (get_numeric, get_numeric_series, ["PRICE"]),
+    (calculate_total, calculate_total_series, ["PRICE", "QTY"]),
+    (strip_whitespace, strip_whitespace_series, ["MPC"]),
+    (identify_uom, identify_uom_series, ["UOM"]),
+    (remove_vat, remove_vat_series, ["TOTAL"]),
+]
+
+
+def measure(function, repeat=3):
+    """
+    Times a function, then runs it once more to find its peak memory. The
+    memory is measured separately, as tracing it slows the function down.
+
+    :function: function to call without any arguments
+    :repeat: (optional) the number of times to run it, keeping the fastest
+    :returns: tuple of the fastest time in seconds, and the peak memory in bytes
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(seconds), peak
+
+
+def run_benchmark(results, name, rows, function, repeat=3, **labels):
+    """
+    Measures a function and adds the result to a list of results
+    """
+    print(f"Running {name} on {rows} rows...", flush=True)
+    seconds, peak = measure(function, repeat)
+    results.append(
+        {
+            "name": name,
+            "rows": rows,
+            **labels,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds else None,
+            "peak_memory_bytes": peak,
+        }
+    )
+
+
+def benchmark_pairs(results, kind, pairs, data, repeat):
+    """
+    Times the cell and series versions of functions on the same columns
+    :kind: the kind of function e.g. "validator"
+    :pairs: list of the cell function, the series function and the columns
+    """
+    for function, series_function, columns in pairs:
+        values = [data[column] for column in columns]
+        run_benchmark(
+            results,
+            f"{kind}.{function_name(function)}",
+            len(data),
+            lambda: [function(*row) for row in zip(*values)],
+            repeat,
+            column=",".join(columns),
+        )
+        run_benchmark(
+            results,
+            f"{kind}.{function_name(series_function)}",
+            len(data),
+            lambda: series_function(*values),
+            repeat,
+            column=",".join(columns),
+        )
+
+
+def benchmark_validators(results, config, data, repeat):
+    """
+    Times the cell and series versions of every validator, then any other
+    validator the configuration uses on the column it checks
+    """
+    benchmark_pairs(results, "validator", VALIDATORS, data, repeat)
+
+    timed = {f for pair in VALIDATORS for f in pair[:2]}
+    for column in compile_config(config).validation.columns:
+        for function in column.functions:
+            if function in timed:
+                continue
+            run_benchmark(
+                results,
+                f"validator.{function_name(function)}",
+                len(data),
+                lambda: find_invalid(data[column.title], [function]),
+                repeat,
+                column=column.title,
+            )
+
+
+def benchmark_rules(results, config, data, repeat):
+    """
+    Times each rule in the configuration
+    """
+    for rule in compile_config(config).validation.rules:
+        run_benchmark(
+            results,
+            f"rule.{rule.name}",
+            len(data),
+            lambda: find_rule_invalid(
+                data[list(rule.titles)], rule.function, dict(rule.kwargs)
+            ),
+            repeat,
+            column=",".join(rule.titles),
+        )
+
+
+def benchmark_transformations(results, config, data, repeat):
+    """
+    Times the cell and series versions of every transformation, then each
+    output column in the configuration which uses any other function on its
+    own, along with any operations it depends on
+    """
+    benchmark_pairs(results, "transformation", TRANSFORMATIONS, data, repeat)
+
+    timed = {f for pair in TRANSFORMATIONS for f in pair[:2]}
+    for col, operations in config["transformation"]["columns"].items():
+        if all(operation["function"] in timed for operation in operations):
+            continue
+        columns = list(col) if isinstance(col, tuple) else [col]
+        run_benchmark(
+            results,
+            f"transformation.{function_name(operations[-1]['function'])}",
+            len(data),
+            lambda: apply_transformation_from_config(config, data, columns=columns),
+            repeat,
+            column=str(col),
+        )
+
+
+def benchmark_pipeline(results, config, path, rows, repeat):
+    """
+    Times reading, validating and transforming a file
+    """
+    filetype = path.suffix[1:]
+    run_benchmark(
+        results,
+        "read",
+        rows,
+        lambda: SourceFile(path, config),
+        repeat,
+        filetype=filetype,
+    )
+
+    source = SourceFile(path, config)
+    run_benchmark(
+        results,
+        "apply_validation_from_config",
+        rows,
+        lambda: apply_validation_from_config(config, source),
+        repeat,
+        filetype=filetype,
+    )
+
+    run_benchmark(
+        results,
+        "apply_transformation_from_config",
+        rows,
+        lambda: apply_transformation_from_config(config, source),
+        repeat,
+        filetype=filetype,
+    )
+
+
+def benchmark_dagster(results, data, directory, repeat):
+    """
+    Times the example dagster pipeline end to end, if dagster is installed
+    """
+    try:
+        from dagster import execute_pipeline
+    except ImportError:
+        print("Dagster isn't installed, so its pipeline is skipped.")
+        return
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dagster"))
+    from simple_pipeline import simple_pipeline
+
+    path = Path(directory) / "dagster.csv"
+    data.rename(columns=DAGSTER_COLUMNS)[list(DAGSTER_COLUMNS.values())].to_csv(
+        path, index=False
+    )
+    run_config = {
+        "solids": {
+            "read_data": {"config": {"data_path": str(path)}},
+            "get_numeric": {"config": {"columns": ["price", "qty"]}},
+            "strip_whitespace": {"config": {"columns": ["code"]}},
+        }
+    }
+    run_benchmark(
+        results,
+        "dagster.simple_pipeline",
+        len(data),
+        lambda: execute_pipeline(simple_pipeline, run_config=run_config),
+        repeat,
+        filetype="csv",
+    )
+
+
+def compare_results(previous, current, tolerance=0.1):
+    """
+    Finds the benchmarks which have become slower between two sets of results
+
+    :previous: dictionary of earlier results
+    :current: dictionary of new results
+    :tolerance: (optional) the proportion a benchmark can slow down by
+    :returns: list of descriptions of the benchmarks which are slower
+    """
+
+    def key(result):
+        return tuple(
+            (k, v)
+            for k, v in sorted(result.items())
+            if k not in ["seconds", "rows_per_second", "peak_memory_bytes"]
+        )
+
+    earlier = {key(result): result for result in previous["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = earlier.get(key(result))
+        if before and result["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(
+                f"{result['name']} on {result['rows']} rows: "
+                f"{before['seconds']:.3f}s -> {result['seconds']:.3f}s"
+            )
+    return regressions
+
+
+def run_suite(
+    sizes,
+    filetypes=("csv", "xlsx"),
+    null_rate=0.01,
+    invalid_rate=0.02,
+    cardinality=1000,
+    repeat=3,
+):
+    """
+    Runs all the benchmarks on generated data of each size
+
+    :sizes: list of the numbers of rows to test
+    :filetypes: (optional) the types of file to test reading from
+    :null_rate: (optional) the proportion of missing values in each column
+    :invalid_rate: (optional) the proportion of invalid values in each column
+    :cardinality: (optional) the number of distinct values in the text columns
+    :repeat: (optional) the number of times to run each benchmark
+    :returns: dictionary of the settings and results
+    """
+    config = update_default_config(copy.deepcopy(default_config), custom_config)
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            data = generate_supplier_data(
+                rows,
+                null_rate=null_rate,
+                invalid_rate=invalid_rate,
+                cardinality=cardinality,
+            )
+            benchmark_validators(results, config, data, repeat)
+            benchmark_rules(results, config, data, repeat)
+            benchmark_transformations(results, config, data, repeat)
+            for filetype in filetypes:
+                if filetype == "xlsx" and rows > XLSX_MAX_ROWS:
+                    print(f"Excel files can't hold {rows} rows, so they are skipped.")
+                    continue
+                path = write_supplier_file(data, Path(directory) / str(rows), filetype)
+                benchmark_pipeline(results, config, path, rows, repeat)
+            benchmark_dagster(results, data, directory, repeat)
+
+    return {
+        "settings": {
+            "sizes": list(sizes),
+            "filetypes": list(filetypes),
+            "null_rate": null_rate,
+            "invalid_rate": invalid_rate,
+            "cardinality": cardinality,
+            "repeat": repeat,
+        },
+        "environment": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "first_package": getattr(first_package, "__version__", None),
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark first_package.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument(
+        "--filetypes", nargs="+", choices=["csv", "xlsx"], default=["csv", "xlsx"]
+    )
+    parser.add_argument("--null-rate", type=float, default=0.01)
+    parser.add_argument("--invalid-rate", type=float, default=0.02)
+    parser.add_argument("--cardinality", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="results.json")
+    parser.add_argument("--compare", help="earlier results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # Only show the progress of the benchmarks
+    logging.basicConfig(level=logging.CRITICAL)
+
+    suite = run_suite(
+        args.rows,
+        filetypes=args.filetypes,
+        null_rate=args.null_rate,
+        invalid_rate=args.invalid_rate,
+        cardinality=args.cardinality,
+        repeat=args.repeat,
+    )
+    with open(args.output, "w") as f:
+        json.dump(suite, f, indent=2)
+    print(f"Written {len(suite['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(json.load(f), suite, args.tolerance)
+        for regression in regressions:
+            print(f"Slower: {regression}")
+        sys.exit(1 if regressions else 0)
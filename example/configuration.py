@@ -10,12 +10,13 @@ from first_package import (
     not_zero_pound_penny,
     must_be_positive,
     check_eclass,
-    contains_only_digit_period,
+    # rules
+    total_outside_variance_series,
     # transformation
-    calculate_total,
-    strip_whitespace,
-    identify_uom,
-    get_numeric,
+    calculate_total_series,
+    strip_whitespace_series,
+    identify_uom_series,
+    get_numeric_series,
     get_row_number,
 )
 
@@ -84,7 +85,6 @@ default_config = {
                 "functions": [must_be_numeric],
                 "threshold": 0.1,
                 "mandatory": True,
-                "variance_threshold": 500000,
             },
             "UOM": {
                 "title": "UOM",
@@ -94,7 +94,8 @@ default_config = {
             },
             "POLINE": {
                 "title": "POLINE",
-                "functions": [contains_only_digit_period],
+                # Specs like this are checked on the whole column at once
+                "functions": [{"regex": r"^[\d\.]+$"}],
                 "threshold": 0.15,
                 "mandatory": False,
             },
@@ -117,46 +118,57 @@ default_config = {
                 "mandatory": False,
             },
         },
+        # Rules which compare several columns, taking a series for each
+        "rules": {
+            "TOTAL_VARIANCE": {
+                "function": total_outside_variance_series,
+                "data": ["PRICE", "QTY", "TOTAL"],
+                "threshold": 0.1,
+                "mandatory": True,
+                "kwargs": {"variance_threshold": 500000},
+            },
+        },
     },
+    # Each output column, from the columns of the supplier file
     "transformation": {
         "columns": {
             "price": [
                 {
-                    "function": get_numeric,
-                    "data": ["price"],
-                    "functiontype": "columns",
+                    "function": get_numeric_series,
+                    "data": ["PRICE"],
+                    "functiontype": "series",
                     "kwargs": {"decimal_place": 2},
                 }
             ],
             "qty": [
                 {
-                    "function": get_numeric,
-                    "data": ["qty"],
-                    "functiontype": "columns",
+                    "function": get_numeric_series,
+                    "data": ["QTY"],
+                    "functiontype": "series",
                     "kwargs": {"decimal_place": 1},
                 }
             ],
             "total": [
                 {
-                    "function": calculate_total,
-                    "data": ["price", "qty"],
-                    "functiontype": "columns",
+                    "function": calculate_total_series,
+                    "data": ["PRICE", "QTY"],
+                    "functiontype": "series",
                     "kwargs": {},
                 }
             ],
             "code": [
                 {
-                    "function": strip_whitespace,
-                    "data": ["code"],
-                    "functiontype": "columns",
+                    "function": strip_whitespace_series,
+                    "data": ["MPC"],
+                    "functiontype": "series",
                     "kwargs": {},
                 }
             ],
             ("uom_value", "uom_desc"): [
                 {
-                    "function": identify_uom,
-                    "data": ["uom"],
-                    "functiontype": "columns",
+                    "function": identify_uom_series,
+                    "data": ["UOM"],
+                    "functiontype": "series",
                     "kwargs": {},
                 }
             ],
@@ -1,4 +1,4 @@
-from first_package import remove_vat
+from first_package import remove_vat_series
 
 custom_config = {
     "name": "custom",
@@ -6,9 +6,9 @@ custom_config = {
         "columns": {
             "price": [
                 {
-                    "function": remove_vat,
-                    "data": ["price"],
-                    "functiontype": "columns",
+                    "function": remove_vat_series,
+                    "data": ["PRICE"],
+                    "functiontype": "series",
                     "kwargs": {},
                 }
             ],
@@ -0,0 +1,30 @@
+import logging
+import sys
+
+from first_package import run_batch, update_default_config
+from configuration import default_config
+from custom_configuration import custom_config
+
+if __name__ == "__main__":
+
+    # Set up the logger
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%d-%b-%y %H:%M:%S",
+        level=logging.INFO,
+    )
+
+    # Folder (or glob) of files to process
+    inbox = sys.argv[1] if len(sys.argv) > 1 else "*.csv"
+
+    # Identify any additional configurations required
+    config = update_default_config(default_config, custom_config)
+
+    # Validate and transform the files
+    summary = run_batch(
+        config, inbox, pass_dir="pass", reject_dir="reject", error_dir="error"
+    )
+    print(
+        f"{summary['passed']} passed, {summary['rejected']} rejected, "
+        f"{summary['errors']} errors"
+    )
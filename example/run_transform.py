@@ -1,8 +1,8 @@
 import logging
-import pandas as pd
 from pathlib import Path
 
 from first_package import (
+    SourceFile,
     apply_validation_from_config,
     apply_transformation_from_config,
     update_default_config,
@@ -22,8 +22,8 @@ if __name__ == "__main__":
 
     datafilepath = Path("XXX_010521_310521.csv")  # Path("data.csv")
 
-    # Read in the data
-    df = pd.read_csv(datafilepath, mangle_dupe_cols=True)
+    # Read in the data, only once
+    source = SourceFile(datafilepath)
 
     # Identify any additional configurations required
     config = update_default_config(default_config, custom_config)
@@ -31,9 +31,9 @@ if __name__ == "__main__":
     # Check the config file is the right format
     if check_configuration(config):
         # Check file is valid
-        if apply_validation_from_config(config, df, datafilepath):
+        if apply_validation_from_config(config, source):
             # Display the result
             print("pass")
-            # print(apply_transformation_from_config(config, df))
+            # print(apply_transformation_from_config(config, source))
     else:
         print("Ill formed configuration file")
@@ -0,0 +1,20 @@
+import logging
+
+from first_package import update_default_config, watch_inbox
+from configuration import default_config
+from custom_configuration import custom_config
+
+if __name__ == "__main__":
+
+    # Set up the logger
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%d-%b-%y %H:%M:%S",
+        level=logging.INFO,
+    )
+
+    # Identify any additional configurations required
+    config = update_default_config(default_config, custom_config)
+
+    # Process each file as it arrives, until stopped with Ctrl+C
+    watch_inbox(config, "inbox", "pass", "reject", output_dir="output")
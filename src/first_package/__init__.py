@@ -5,18 +5,39 @@ from .transformations import (
     identify_uom,
     get_numeric,
     get_row_number,
+    strip_whitespace_series,
+    calculate_total_series,
+    remove_vat_series,
+    identify_uom_series,
+    get_numeric_series,
 )
 from .apply_configuration import (
     apply_validation_from_config,
+    apply_validation_from_chunks,
     apply_transformation_from_config,
+    apply_transformation_from_chunks,
     update_default_config,
     check_configuration,
+    compile_config,
 )
 
-from .utils import get_date, get_date_ddmmyyyy, last_of_month, first_of_month, copy_file
+from .utils import (
+    get_date,
+    get_date_ddmmyyyy,
+    get_date_series,
+    get_date_ddmmyyyy_series,
+    last_of_month,
+    first_of_month,
+    copy_file,
+    probe_workbook,
+    SheetInfo,
+)
 
 from .validators import (
     check_column,
+    check_invalid,
+    check_rule,
+    check_threshold,
     check_column_names,
     check_filename,
     check_filedates,
@@ -32,4 +53,38 @@ from .validators import (
     check_total,
     check_eclass,
     contains_only_digit_period,
+    check_empty_series,
+    must_be_valid_date_in_ddmmyyyy_series,
+    must_contain_digit_series,
+    must_contain_letter_series,
+    must_be_numeric_series,
+    must_be_alphanumeric_space_period_series,
+    not_zero_pound_penny_series,
+    must_be_positive_series,
+    check_total_series,
+    check_eclass_series,
+    contains_only_digit_period_series,
+    total_outside_variance_series,
+    dates_out_of_order_series,
+    SpecValidator,
+    compile_validator,
+    SERIES_VALIDATORS,
 )
+
+from .reference_data import ReferenceSet, get_reference, set_reference_file
+
+from .plan import ExecutionPlan
+
+from .loader import SourceFile
+from .cache import FileCache
+from .incremental import RowStore
+
+from .stats import Stats
+
+from .results import ValidationResult, ColumnResult
+
+from .database import ConnectionPool, sqlite_pool, load_dataframe
+
+from .batch import run_batch, process_file
+
+from .watcher import InboxWatcher, watch_inbox
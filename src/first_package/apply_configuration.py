@@ -1,190 +1,965 @@
 import collections.abc
+import inspect
 import logging
+import re
+import time
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel, Field, ValidationError, confloat
+from pathlib import Path
+from pydantic import BaseModel, Field, ValidationError, confloat, conint
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+from .incremental import apply_incremental, store_key
+from .loader import SourceFile
+from .memoize import apply_unique
+from .plan import ExecutionPlan, fingerprint, get_plan, prune_transformation
+from .results import ValidationResult, column_result
+from .stats import function_name
+from .utils import get_date_series
 from .validators import (
     check_column_names,
+    check_daterange,
     check_filestructure,
     check_filedates,
     check_filename,
     check_column,
+    check_column_with_messages,
+    check_invalid,
+    check_rule,
+    check_threshold,
+    compile_validator,
+    find_invalid,
+    find_rule_invalid,
+    get_filename_dates,
 )
 
 
+class TransformationColumnConfiguration(BaseModel):
+    function: Callable
+    data: List[str]
+    functiontype: str
+    kwargs: Dict[str, Any]
+    source: str = "input"
+
+
+class ValidatorSpecConfiguration(BaseModel):
+    regex: Optional[str]
+    range: Optional[Tuple[Optional[float], Optional[float]]]
+    in_set: Optional[List[Any]]
+    max_length: Optional[conint(ge=0)]
+
+    class Config:
+        extra = "forbid"
+
+
+class ValidationColumnConfiguration(BaseModel):
+    title: str
+    functions: List[Union[Callable, ValidatorSpecConfiguration]]
+    threshold: confloat(ge=0, le=1)
+    mandatory: bool
+
+
+class ValidationRuleConfiguration(BaseModel):
+    function: Callable
+    data: List[str]
+    threshold: confloat(ge=0, le=1)
+    mandatory: bool
+    kwargs: Dict[str, Any] = {}
+
+
+class FileNameConfiguration(BaseModel):
+    validate_: bool = Field(alias="validate")
+    pattern: str
+
+
+class FileStructureConfiguration(BaseModel):
+    validate_: bool = Field(alias="validate")
+    multiple_sheets: bool
+
+
+class FileDatesConfiguration(BaseModel):
+    validate_: bool = Field(alias="validate")
+    data_field: Optional[str]
+    min_file_date_regex: Optional[str]
+    max_file_date_regex: Optional[str]
+    grace_days: Optional[int]
+
+
+class CheckHeadingsConfiguration(BaseModel):
+    validate_: bool = Field(alias="validate")
+
+
+class TransformationConfiguration(BaseModel):
+    columns: Dict[Union[str, Tuple[str, ...]], List[TransformationColumnConfiguration]]
+
+
+class ValidationConfiguration(BaseModel):
+    check_filename: FileNameConfiguration
+    check_filedates: FileDatesConfiguration
+    check_filestructure: FileStructureConfiguration
+    check_headings: CheckHeadingsConfiguration
+    columns: Dict[Union[str, Tuple[str, ...]], ValidationColumnConfiguration]
+    rules: Dict[str, ValidationRuleConfiguration] = {}
+
+
+class ConfigurationBase(BaseModel):
+    name: str
+    validation: ValidationConfiguration
+    transformation: TransformationConfiguration
+
+
+# Fingerprints of configurations which have already been checked
+VALID_CONFIGURATIONS = set()
+
+
 def check_configuration(config):
     """
     Checks the configuration fits the required pattern
 
-    :config: The dictionary configuration
+    :config: The dictionary configuration, or an ExecutionPlan
     """
 
-    class TransformationColumnConfiguration(BaseModel):
-        function: Callable
-        data: List[str]
-        functiontype: str
-        kwargs: Dict[str, Any]
-
-    class ValidationColumnConfiguration(BaseModel):
-        title: str
-        functions: List[Callable]
-        threshold: confloat(ge=0, le=1)
-        mandatory: bool
-
-    class FileNameConfiguration(BaseModel):
-        validate_: bool = Field(alias="validate")
-        pattern: str
-
-    class FileStructureConfiguration(BaseModel):
-        validate_: bool = Field(alias="validate")
-        multiple_sheets: bool
-
-    class FileDatesConfiguration(BaseModel):
-        validate_: bool = Field(alias="validate")
-        data_field: Optional[str]
-        min_file_date_regex: Optional[str]
-        max_file_date_regex: Optional[str]
-        grace_days: Optional[int]
-
-    class CheckHeadingsConfiguration(BaseModel):
-        validate_: bool = Field(alias="validate")
-
-    class TransformationConfiguration(BaseModel):
-        columns: Dict[
-            Union[str, Tuple[str, ...]], List[TransformationColumnConfiguration]
-        ]
-
-    class ValidationConfiguration(BaseModel):
-        check_filename: FileNameConfiguration
-        check_filedates: FileDatesConfiguration
-        check_filestructure: FileStructureConfiguration
-        check_headings: CheckHeadingsConfiguration
-        columns: Dict[Union[str, Tuple[str, ...]], ValidationColumnConfiguration]
-
-    class ConfigurationBase(BaseModel):
-        name: str
-        validation: ValidationConfiguration
-        transformation: TransformationConfiguration
+    # Plans are only created from valid configurations
+    if isinstance(config, ExecutionPlan):
+        return True
 
     try:
-        config = ConfigurationBase(**config)
-        return True
+        ConfigurationBase(**config)
     except ValidationError as e:
         print(e.json())
         return False
 
+    # Compile the validator specs, so a bad one fails here rather than mid-file
+    for name, column in config["validation"]["columns"].items():
+        for validator in column["functions"]:
+            try:
+                compile_validator(validator)
+            except (ValueError, TypeError, re.error) as e:
+                logging.error(f"Invalid validator for column {name}: {e}")
+                return False
+    return True
 
-def apply_transformation_from_config(config, data):
+
+def compile_config(config):
     """
-    Basic application of a python configuration file to a dataframe
+    Checks a configuration and creates an execution plan from it, which
+    can be passed to any function in place of the configuration. Plans are
+    reused for configurations with the same fingerprint.
 
-    :config: dictionary of the required transformations
-    :data: dataframe of data to apply the functions to
-    :returns: dataframe of columns as documented in the config
+    :config: The dictionary configuration
+    :returns: ExecutionPlan
     """
+    if isinstance(config, ExecutionPlan):
+        return config
 
-    # Create a new empty dataframe with the same number of rows as the original one
-    df = pd.DataFrame(index=data.index)
-
-    # Apply configuration to columns
-    for col, meta in config["transformation"]["columns"].items():
-        # For each function to be applied
-        for operation in meta:
-            fn = operation["function"]
-            # Check whether the function is to be applied to the source data frame
-            if operation["data"] and operation["functiontype"] == "columns":
-                result = data.apply(
-                    lambda row: fn(
-                        *[row[c] for c in operation["data"]], **operation["kwargs"]
-                    ),
-                    axis=1,
-                )
-            # If data has been provided but not specified its to be applied to the columns
-            # raise an error
-            elif operation["data"]:
-                raise exception(
-                    "Keyword 'data' is only applicable for 'functiontype' of 'columns'"
+    key = fingerprint(config)
+    if key not in VALID_CONFIGURATIONS:
+        if not check_configuration(config):
+            raise ValueError("Ill formed configuration file")
+        VALID_CONFIGURATIONS.add(key)
+    return get_plan(config, key)
+
+
+def expand_result(result, rows, mandatory):
+    """
+    Expands the result of a column to cover rows which weren't checked
+
+    :result: ColumnResult of the rows which were checked
+    :rows: boolean array, True for each row which was checked
+    :mandatory: whether the column has to pass
+    :returns: ColumnResult covering every row
+    """
+    if rows.all():
+        return result._replace(mandatory=mandatory)
+    invalid = np.zeros(len(rows), dtype=bool)
+    invalid[rows] = result.mask()
+    return column_result(invalid, result.passed, mandatory)
+
+
+def find_invalid_checks(meta, data, memoize=False, stats=None):
+    """
+    Finds the invalid rows of every column and rule of a validation plan
+
+    :meta: ValidationPlan
+    :data: dataframe of the data to check
+    :memoize: (optional) only call functions once for each distinct value
+    :stats: (optional) Stats to record the time taken by each function
+    :returns: boolean dataframe with a column for each column of the plan,
+        then each rule, named by their position
+    """
+    invalid = [
+        find_invalid(data[column.title], column.functions, memoize, stats)
+        for column in meta.columns
+    ]
+    invalid += [
+        find_rule_invalid(
+            data[list(rule.titles)], rule.function, dict(rule.kwargs), stats
+        )
+        for rule in meta.rules
+    ]
+    return pd.DataFrame(
+        {str(i): values for i, values in enumerate(invalid)}, index=data.index
+    )
+
+
+def find_unstored_outputs(plan):
+    """
+    Finds the outputs of a transformation plan which depend on more than the
+    values in each row, so can't be stored for each row. These are outputs
+    such as the row number from a 'dataframe' function, or today's date from
+    a function which isn't given any data.
+
+    :plan: TransformationPlan
+    :returns: set of the output column names
+    """
+    unstored = set()
+    for i, node in enumerate(plan.nodes):
+        if (
+            node.functiontype == "dataframe"
+            or not node.inputs
+            or any(source.node in unstored for source in node.inputs)
+        ):
+            unstored.add(i)
+    return {col for col, source in plan.outputs if source.node in unstored}
+
+
+def split_result(result, index):
+    """
+    Splits the result of a function with several outputs into a series for each
+
+    :result: dataframe from a series function, or a tuple per row from a row function
+    :index: the index of the source data
+    :returns: list of series
+    """
+    if isinstance(result, pd.DataFrame):
+        return [r for _, r in result.items()]
+    return [pd.Series(r, index=index) for r in zip(*result)]
+
+
+def apply_transformation_from_config(
+    config,
+    data,
+    memoize=False,
+    columns=None,
+    stats=None,
+    exclude=None,
+    store=None,
+    row_offset=0,
+):
+    """
+    Basic application of a python configuration file to a dataframe.
+    Each distinct operation is computed once, and only if its result is needed.
+
+    :config: dictionary of the required transformations, or an ExecutionPlan
+    :data: dataframe of data to apply the functions to, or a SourceFile
+    :memoize: (optional) only call 'columns' functions once for each distinct
+        combination of values
+    :columns: (optional) list of the output columns needed, otherwise all of them
+    :stats: (optional) Stats to record the time taken by each operation
+    :exclude: (optional) rows to leave out, as a boolean array with True for
+        each row to exclude, or a ValidationResult to leave out the invalid rows
+    :store: (optional) RowStore of the results of rows seen before, so only
+        new or changed rows are transformed. Outputs which depend on more than
+        each row, such as row numbers or today's date, are still computed
+        for every row.
+    :row_offset: (optional) the number of rows before data, when it's one
+        chunk of a larger file. It's given to 'dataframe' functions which
+        take a row_offset, such as get_row_number.
+    :returns: dataframe of columns as documented in the config
+    """
+    if isinstance(data, SourceFile):
+        data = data.data
+    if isinstance(exclude, ValidationResult):
+        exclude = exclude.invalid_rows()
+    if exclude is not None:
+        data = data[~np.asarray(exclude, dtype=bool)]
+
+    if store is not None:
+        full_plan = get_plan(config)
+        plan = full_plan.transformation
+        outputs = [col for col, _ in plan.outputs] if columns is None else columns
+        unstored = find_unstored_outputs(plan)
+        row_outputs = [col for col, _ in plan.outputs if col not in unstored]
+        # Every output for each row is stored, whichever columns are needed now
+        row_plan = prune_transformation(plan, row_outputs)
+        sources = sorted(
+            {s.column for node in row_plan.nodes for s in node.inputs if s.node is None}
+        )
+        results = pd.DataFrame(index=data.index)
+        if row_outputs:
+            results = apply_incremental(
+                store,
+                store_key("transformation", row_plan),
+                "transformation",
+                data[sources],
+                lambda rows: apply_transformation_from_config(
+                    full_plan, rows, memoize, columns=row_outputs, stats=stats
+                ),
+            )
+        others = [col for col in outputs if col in unstored]
+        if others:
+            results = results.join(
+                apply_transformation_from_config(
+                    full_plan,
+                    data,
+                    memoize,
+                    columns=others,
+                    stats=stats,
+                    row_offset=row_offset,
                 )
-            elif operation["functiontype"] == "dataframe":
-                result = fn(data, **operation["kwargs"])
-            # Apply the function using the kwargs only
+            )
+        return results[list(outputs)]
+
+    plan = get_plan(config).transformation
+    if columns is not None:
+        plan = prune_transformation(plan, columns)
+
+    results = []
+    split_results = {}
+
+    def get_values(source):
+        # Values from the source data
+        if source.node is None:
+            return data[source.column]
+        result = results[source.node]
+        if source.column is None:
+            return result
+        # Values from one of several outputs of a node
+        if source.node not in split_results:
+            split_results[source.node] = split_result(result, data.index)
+        values = split_results[source.node]
+        if source.column < len(values):
+            return values[source.column]
+        # There were no rows to split
+        return pd.Series(index=data.index, dtype=object)
+
+    # Compute the nodes in order, so their inputs are always ready
+    for node in plan.nodes:
+        if stats is not None:
+            start = time.perf_counter()
+        fn = node.function
+        kwargs = dict(node.kwargs)
+        args = []
+        for source in node.inputs:
+            values = get_values(source)
+            # Outputs such as constants need to become columns to be used as inputs
+            if not isinstance(values, (pd.Series, pd.DataFrame)):
+                values = pd.Series(values, index=data.index)
+            args.append(values)
+
+        # Check whether the function is to be applied to each row
+        if args and node.functiontype == "columns" and memoize:
+            result = apply_unique(fn, args, kwargs)
+        elif args and node.functiontype == "columns":
+            if all(source.node is None for source in node.inputs):
+                names = [source.column for source in node.inputs]
+                rows = data
             else:
-                result = fn(**operation["kwargs"])
+                names = list(range(len(args)))
+                rows = pd.concat(args, axis=1, keys=names)
+            result = rows.apply(
+                lambda row: fn(*[row[c] for c in names], **kwargs),
+                axis=1,
+            )
+        # Check whether the function is to be applied to whole columns at once
+        elif args and node.functiontype == "series":
+            result = fn(*args, **kwargs)
+        # If data has been provided but not specified its to be applied to the columns
+        # raise an error
+        elif args:
+            raise ValueError(
+                "Keyword 'data' is only applicable for 'functiontype' of "
+                "'columns' or 'series'"
+            )
+        elif node.functiontype == "dataframe":
+            if row_offset and "row_offset" in inspect.signature(fn).parameters:
+                kwargs.setdefault("row_offset", row_offset)
+            result = fn(data, **kwargs)
+        # Apply the function using the kwargs only
+        else:
+            result = fn(**kwargs)
 
-            # Where the result is to be stored across multiple columns, extract it
-            if isinstance(col, tuple):
-                for c, r in zip(col, zip(*result)):
-                    df[c] = r
-            else:
-                df[col] = result
+        if stats is not None:
+            stats.since(f"transformation.{function_name(fn)}", start, len(data))
+        results.append(result)
 
-    return df
+    # Create the dataframe in one go, with the same rows as the original one
+    return pd.DataFrame(
+        {col: get_values(source) for col, source in plan.outputs}, index=data.index
+    )
+
+
+def conform_chunk(df, dtypes=None):
+    """
+    Converts a transformed chunk to the types of the earlier chunks, so every
+    chunk of a file is written the same way. Integer columns are allowed
+    missing values, as a later chunk may have them when the first didn't,
+    and become decimals if a later chunk has numbers which aren't whole.
+
+    :df: dataframe of a transformed chunk
+    :dtypes: (optional) series of the type of each column, from the earlier chunks
+    :returns: tuple of the converted dataframe, and the types of its columns,
+        which are wider than dtypes if the chunk needed them to be
+    """
+    if dtypes is None:
+        nullable = {"i": "Int64", "u": "UInt64", "b": "boolean"}
+        dtypes = pd.Series(
+            {
+                column: nullable.get(getattr(dtype, "kind", None), dtype)
+                for column, dtype in df.dtypes.items()
+            },
+            dtype=object,
+        )
+    df = df.copy()
+    for column, dtype in dtypes.items():
+        values = df[column]
+        try:
+            df[column] = values.astype(dtype)
+        except (TypeError, ValueError) as e:
+            # Widen whole numbers to decimals, rather than losing the fractions
+            if not (
+                pd.api.types.is_integer_dtype(dtype)
+                and pd.api.types.is_numeric_dtype(values)
+                and not pd.api.types.is_bool_dtype(values)
+            ):
+                raise ValueError(
+                    f"Chunk doesn't match the types of the earlier chunks: {e}"
+                )
+            dtypes = dtypes.copy()
+            dtypes[column] = "Float64"
+            df[column] = values.astype("Float64")
+    return df, dtypes
 
 
-def apply_validation_from_config(config, data, datafilepath):
+def rewrite_parquet(path, newpath, schema, row_group_size):
+    """
+    Copies a parquet file to a new one with a wider schema, one row group at
+    a time, and leaves the new one open to append to
+
+    :path: pathlib.Path object of the file to copy, which is removed afterwards
+    :newpath: pathlib.Path object of the file to copy to
+    :schema: pyarrow schema of the new file
+    :row_group_size: the number of rows in each parquet row group
+    :returns: pyarrow ParquetWriter of the new file
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = pq.ParquetWriter(newpath, schema)
+    with pq.ParquetFile(path) as written:
+        for batch in written.iter_batches(batch_size=row_group_size):
+            writer.write_table(
+                pa.Table.from_batches([batch]).cast(schema),
+                row_group_size=row_group_size,
+            )
+    path.unlink()
+    return writer
+
+
+def apply_transformation_from_chunks(
+    config,
+    chunks,
+    outputpath,
+    memoize=False,
+    columns=None,
+    row_group_size=65536,
+    schema=None,
+    stats=None,
+):
+    """
+    Transforms data one chunk at a time, and appends each transformed chunk
+    to a parquet or csv file, so neither the data nor the result has to be
+    held in memory all at once. Functions with a 'functiontype' of
+    'dataframe' are given one chunk at a time, along with the number of rows
+    before it if they take a row_offset, so row numbers carry on across chunks.
+
+    Every chunk of a parquet file is converted to the types of the earlier
+    ones, so the whole file has one schema. If a later chunk has decimals in
+    a column of whole numbers, the column becomes decimals, and the rows
+    already written are copied into a file with the wider schema.
+
+    :config: dictionary of the required transformations, or an ExecutionPlan
+    :chunks: iterable of dataframes e.g. from pd.read_csv(..., chunksize=...)
+    :outputpath: pathlib.Path object to write to, ending .parquet or .csv
+    :memoize: (optional) only call 'columns' functions once for each distinct
+        combination of values
+    :columns: (optional) list of the output columns needed, otherwise all of them
+    :row_group_size: (optional) the number of rows in each parquet row group
+    :schema: (optional) pyarrow schema for the parquet file, otherwise the
+        types of the first chunk are used, widened as later chunks need
+    :stats: (optional) Stats to record the time taken by each operation
+    :returns: dictionary of the path written to, and the number of rows
+        read and written
+    """
+    outputpath = Path(outputpath)
+    parquet = outputpath.suffix.upper() == ".PARQUET"
+    if parquet:
+        # Only needed for parquet files
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        # The file being written, which moves if it's copied to a wider schema
+        writerpath = outputpath
+        fixed_schema = schema is not None
+        pending = []
+        pending_rows = 0
+
+    dtypes = None
+    rows_in = 0
+    rows_out = 0
+    started = False
+    try:
+        for chunk in chunks:
+            df = apply_transformation_from_config(
+                config,
+                chunk,
+                memoize=memoize,
+                columns=columns,
+                stats=stats,
+                row_offset=rows_in,
+            )
+            rows_in += len(chunk)
+            rows_out += len(df)
+            first = not started
+            started = True
+
+            if not parquet:
+                # Only the first chunk has the headings
+                df.to_csv(
+                    outputpath, mode="w" if first else "a", header=first, index=False
+                )
+                continue
+
+            earlier = dtypes
+            df, dtypes = conform_chunk(df, dtypes)
+            if writer is not None and not fixed_schema and not dtypes.equals(earlier):
+                # Widen the columns of the rows which have been written already
+                schema = pa.schema(
+                    [
+                        (
+                            field.with_type(pa.float64())
+                            if dtypes[field.name] != earlier[field.name]
+                            else field
+                        )
+                        for field in schema
+                    ],
+                    # So pandas reads the columns back with the wider types
+                    metadata=pa.Schema.from_pandas(df, preserve_index=False).metadata,
+                )
+                pending = [table.cast(schema) for table in pending]
+                writer.close()
+                newpath = outputpath.with_name(f"{outputpath.name}.tmp")
+                if writerpath == newpath:
+                    newpath = outputpath
+                writer = rewrite_parquet(writerpath, newpath, schema, row_group_size)
+                writerpath = newpath
+
+            table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            if writer is None:
+                # Columns with no values in the first chunk are taken to be text
+                schema = pa.schema(
+                    [
+                        (
+                            field.with_type(pa.string())
+                            if pa.types.is_null(field.type)
+                            else field
+                        )
+                        for field in table.schema
+                    ],
+                    metadata=table.schema.metadata,
+                )
+                table = table.cast(schema)
+                writer = pq.ParquetWriter(writerpath, schema)
+            pending.append(table)
+            pending_rows += len(table)
+
+            # Only write whole row groups, and keep the rest for the next chunk
+            if pending_rows >= row_group_size:
+                table = pa.concat_tables(pending)
+                complete = pending_rows - pending_rows % row_group_size
+                writer.write_table(
+                    table.slice(0, complete), row_group_size=row_group_size
+                )
+                pending = [table.slice(complete)]
+                pending_rows -= complete
+
+        if parquet and writer is not None and pending_rows:
+            writer.write_table(pa.concat_tables(pending))
+    finally:
+        if parquet and writer is not None:
+            writer.close()
+            if writerpath != outputpath:
+                writerpath.replace(outputpath)
+
+    # There was no data, but the file should still exist
+    if not started and parquet:
+        pd.DataFrame().to_parquet(outputpath)
+    elif not started:
+        pd.DataFrame().to_csv(outputpath, index=False)
+
+    logging.info(f"Written {rows_out} rows to {outputpath.name}.")
+    return {"path": outputpath, "rows_in": rows_in, "rows_out": rows_out}
+
+
+def apply_validation_from_config(
+    config,
+    data,
+    datafilepath=None,
+    fail_fast=False,
+    executor=None,
+    memoize=False,
+    stats=None,
+    return_result=False,
+    store=None,
+):
     """
     Check a file fulfils basic validation criteria
 
-    :config: dictionary of the required validation checks
-    :data: dataframe of data to apply the functions to
-    :filepath: pathlib.Path object to the original source file
+    :config: dictionary of the required validation checks, or an ExecutionPlan
+    :data: dataframe of data to apply the functions to, or a SourceFile. A
+        SourceFile already knows the structure of the file, so it isn't read again.
+    :filepath: pathlib.Path object to the original source file, which is
+        optional when data is a SourceFile
+    :fail_fast: (optional) stop at the first mandatory column to fail, and only
+        check as many values in each column as are needed to decide
+    :executor: (optional) a concurrent.futures executor to check the columns
+        in parallel. A ProcessPoolExecutor needs the functions to be picklable.
+    :memoize: (optional) only call functions once for each distinct value
+    :stats: (optional) Stats to record the time taken by each check. The
+        validators aren't recorded separately when an executor is used.
+    :return_result: (optional) return a ValidationResult with the invalid rows
+        of every column, including those which aren't mandatory
+    :store: (optional) RowStore of the results of rows seen before, so only
+        new or changed rows are checked. Every column and rule is checked for
+        those rows, and the executor isn't used.
     :returns: True or False on whether file passes the required checks
     """
 
     # Extract the configuration
-    meta = config["validation"]
+    plan = get_plan(config)
+    meta = plan.validation
+
+    # Use what has already been read from the file
+    sheets = None
+    if isinstance(data, SourceFile):
+        datafilepath = datafilepath or data.path
+        sheets = data.sheets
+        headings = data.headings
+        data = data.data
+    else:
+        headings = data.columns
 
     # Set a variable to keep track of how the file is doing
     file_pass = True
+    result = ValidationResult(len(data)) if return_result else None
 
     # Check whether to check the filename format
-    if meta["check_filename"]["validate"]:
-        file_pass = file_pass and check_filename(
-            datafilepath, meta["check_filename"]["pattern"]
-        )
+    if meta.filename_pattern is not None and file_pass:
+        if stats is not None:
+            start = time.perf_counter()
+        file_pass = check_filename(datafilepath, meta.filename_pattern)
+        if stats is not None:
+            stats.since("check_filename", start)
+        if result is not None:
+            result.add_check("check_filename", file_pass)
 
     # Check whether to check the dates in the file match those in the filename
-    if meta["check_filedates"]["validate"]:
-
-        file_pass = file_pass and check_filedates(
-            meta["check_filedates"],
-            data[meta["check_filedates"]["data_field"]],
+    if meta.filedates is not None and file_pass:
+        if stats is not None:
+            start = time.perf_counter()
+        file_pass = check_filedates(
+            meta.filedates._asdict(),
+            data[meta.filedates.data_field],
             f"{datafilepath.stem}",
         )
+        if stats is not None:
+            stats.since("check_filedates", start, len(data))
+        if result is not None:
+            result.add_check("check_filedates", file_pass)
 
     # Check whether to check the file structure e.g. multiple sheets etc.
-    if meta["check_filestructure"]["validate"]:
-        file_pass = file_pass and check_filestructure(
-            datafilepath, meta["check_filestructure"]
+    if meta.filestructure is not None and file_pass:
+        if stats is not None:
+            start = time.perf_counter()
+        file_pass = check_filestructure(
+            datafilepath, meta.filestructure._asdict(), sheets=sheets
         )
+        if stats is not None:
+            stats.since("check_filestructure", start)
+        if result is not None:
+            result.add_check("check_filestructure", file_pass)
 
     # Check whether to check the headings or not
-    if meta["check_headings"]["validate"]:
-
-        file_pass = file_pass and check_column_names(
-            expected_headings=meta["columns"].keys(), found_headings=data.columns
+    if meta.check_headings and file_pass:
+        if stats is not None:
+            start = time.perf_counter()
+        file_pass = check_column_names(
+            expected_headings=[column.name for column in meta.columns],
+            found_headings=headings,
         )
+        if stats is not None:
+            stats.since("check_headings", start)
+        if result is not None:
+            result.add_check("check_headings", file_pass)
 
     # If it's passed up until this point check the individual columns
     if file_pass:
-        columns = meta["columns"]
+        # Drop empty rows
+        not_empty = data.notna().any(axis=1).to_numpy()
+        data = data[not_empty]
+        if result is not None:
+            result.empty = np.packbits(~not_empty)
+
+        # Only the mandatory columns need checking, unless the rows are wanted
+        columns = [c for c in meta.columns if c.mandatory or return_result]
+
+        # Look up the rows which have been checked before, and check the rest
+        if store is not None:
+            titles = {column.title for column in meta.columns}
+            titles.update(title for rule in meta.rules for title in rule.titles)
+            invalid = apply_incremental(
+                store,
+                store_key("validation", meta),
+                "validation",
+                data[sorted(titles)],
+                lambda rows: find_invalid_checks(meta, rows, memoize, stats),
+            )
+            checks = {check.name: str(i) for i, check in enumerate(meta.columns)}
+            checks.update(
+                (rule.name, str(i)) for i, rule in enumerate(meta.rules, len(checks))
+            )
+            executor = None
+
+        # Start checking all the columns at once. Their messages are logged
+        # below, so they are in the same order however the checks are run.
+        if executor is not None:
+            futures = {
+                column.name: executor.submit(
+                    check_column_with_messages,
+                    data[column.title],
+                    column.functions,
+                    column.threshold,
+                    fail_fast=fail_fast,
+                    memoize=memoize,
+                    return_result=return_result,
+                )
+                for column in columns
+            }
+
+        logging.info("Checking each column statistics.")
+        try:
+            # Check the validity stats of each column, in the order of the config
+            for column in columns:
+                logging.info(f"Checking column {column.name}...")
+                if stats is not None:
+                    start = time.perf_counter()
+                if store is not None:
+                    column_pass = check_invalid(
+                        invalid[checks[column.name]], column.threshold, return_result
+                    )
+                elif executor is not None:
+                    column_pass, messages = futures[column.name].result()
+                    for level, message in messages:
+                        logging.log(level, message)
+                else:
+                    column_pass = check_column(
+                        data[column.title],
+                        column.functions,
+                        column.threshold,
+                        fail_fast=fail_fast,
+                        memoize=memoize,
+                        stats=stats,
+                        return_result=return_result,
+                    )
+                if stats is not None:
+                    stats.since(f"column.{column.name}", start, len(data))
+                if result is not None:
+                    result.add_column(
+                        column.name,
+                        expand_result(column_pass, not_empty, column.mandatory),
+                    )
+                    column_pass = column_pass.passed
+                # If it's a mandatory column, and doesn't pass checks, fail it
+                if column.mandatory and not column_pass:
+                    logging.error(
+                        f"{column.name} did not pass checks, so the file will be "
+                        "rejected."
+                    )
+                    file_pass = False
+                    if fail_fast:
+                        break
+        finally:
+            # Don't leave any unneeded checks waiting to run
+            if executor is not None:
+                for future in futures.values():
+                    future.cancel()
+
+        # Check the rules which compare several columns, in the order of the config
+        for rule in meta.rules:
+            if fail_fast and not file_pass:
+                break
+            if not (rule.mandatory or return_result):
+                continue
+            logging.info(f"Checking rule {rule.name}...")
+            if stats is not None:
+                start = time.perf_counter()
+            if store is not None:
+                rule_pass = check_invalid(
+                    invalid[checks[rule.name]], rule.threshold, return_result
+                )
+            else:
+                rule_pass = check_rule(
+                    data[list(rule.titles)],
+                    rule.function,
+                    rule.threshold,
+                    dict(rule.kwargs),
+                    stats=stats,
+                    return_result=return_result,
+                )
+            if stats is not None:
+                stats.since(f"rule.{rule.name}", start, len(data))
+            if result is not None:
+                result.add_column(
+                    rule.name, expand_result(rule_pass, not_empty, rule.mandatory)
+                )
+                rule_pass = rule_pass.passed
+            # If it's a mandatory rule, and doesn't pass checks, fail it
+            if rule.mandatory and not rule_pass:
+                logging.error(
+                    f"{rule.name} did not pass checks, so the file will be rejected."
+                )
+                file_pass = False
+
+    if result is not None:
+        result.passed = file_pass
+        return result
+    return file_pass
+
+
+def apply_validation_from_chunks(
+    config, chunks, datafilepath, memoize=False, stats=None
+):
+    """
+    Check a file fulfils basic validation criteria, reading the data one
+    chunk at a time so only a single chunk is ever held in memory.
+    Gives the same result as apply_validation_from_config.
+
+    :config: dictionary of the required validation checks, or an ExecutionPlan
+    :chunks: iterable of dataframes e.g. from pd.read_csv(..., chunksize=...)
+    :filepath: pathlib.Path object to the original source file
+    :memoize: (optional) only call functions once for each distinct value
+    :stats: (optional) Stats to record the time taken by each validator
+    :returns: True or False on whether file passes the required checks
+    """
+
+    # Extract the configuration
+    meta = get_plan(config).validation
+
+    # Check whether to check the filename format, before reading any data
+    if meta.filename_pattern is not None and not check_filename(
+        datafilepath, meta.filename_pattern
+    ):
+        return False
+
+    # Check whether to check the dates in the file match those in the filename
+    if meta.filedates is not None:
+        min_file_date, max_file_date = get_filename_dates(
+            meta.filedates._asdict(), f"{datafilepath.stem}"
+        )
+        if min_file_date is None:
+            return False
+        min_dates = []
+        max_dates = []
+
+    # Keep running totals for the columns and rules which need checking
+    columns = [column for column in meta.columns if column.mandatory]
+    rules = [rule for rule in meta.rules if rule.mandatory]
+    data_invalid = {check.name: 0 for check in columns + rules}
+    data_total = {check.name: 0 for check in columns + rules}
+    expected_headings = [column.name for column in meta.columns]
+    found_headings = None
+
+    for chunk in chunks:
+        # Check the headings as soon as they are known
+        if found_headings is None:
+            found_headings = chunk.columns
+            if meta.check_headings and not check_column_names(
+                expected_headings=expected_headings, found_headings=found_headings
+            ):
+                return False
+
+        # Keep track of the range of dates
+        if meta.filedates is not None:
+            dates = get_date_series(chunk[meta.filedates.data_field]).dropna()
+            if len(dates) > 0:
+                min_dates.append(dates.min())
+                max_dates.append(dates.max())
 
         # Drop empty rows
-        data = data.dropna(how="all")
+        chunk = chunk.dropna(how="all")
+
+        for column in columns:
+            invalid = find_invalid(
+                chunk[column.title], column.functions, memoize=memoize, stats=stats
+            )
+            data_invalid[column.name] += int(invalid.sum())
+            data_total[column.name] += int(invalid.count())
+
+        for rule in rules:
+            invalid = find_rule_invalid(
+                chunk[list(rule.titles)], rule.function, dict(rule.kwargs), stats=stats
+            )
+            data_invalid[rule.name] += int(invalid.sum())
+            data_total[rule.name] += int(invalid.count())
 
+    # Set a variable to keep track of how the file is doing
+    file_pass = True
+
+    if meta.filedates is not None:
+        file_pass = check_daterange(
+            meta.filedates._asdict(),
+            min(min_dates, default=pd.NaT),
+            max(max_dates, default=pd.NaT),
+            min_file_date,
+            max_file_date,
+        )
+
+    # Check whether to check the file structure e.g. multiple sheets etc.
+    if meta.filestructure is not None:
+        file_pass = file_pass and check_filestructure(
+            datafilepath, meta.filestructure._asdict()
+        )
+
+    # If there was no data, the headings still need checking
+    if found_headings is None and meta.check_headings:
+        file_pass = file_pass and check_column_names(
+            expected_headings=expected_headings, found_headings=[]
+        )
+
+    # If it's passed up until this point check the individual columns
+    if file_pass:
         logging.info("Checking each column statistics.")
         # Check the validity stats of each column
-        for col, criteria in columns.items():
-            logging.info(f"Checking column {col}...")
+        for column in meta.columns:
+            logging.info(f"Checking column {column.name}...")
             # If it's a mandatory column, and doesn't pass checks, fail it
-            if criteria["mandatory"] and not check_column(
-                data[criteria["title"]],
-                criteria["functions"],
-                criteria["threshold"],
+            if column.mandatory and not check_threshold(
+                data_invalid[column.name], data_total[column.name], column.threshold
+            ):
+                logging.error(
+                    f"{column.name} did not pass checks, so the file will be rejected."
+                )
+                file_pass = False
+
+        # Check the rules which compare several columns
+        for rule in rules:
+            logging.info(f"Checking rule {rule.name}...")
+            if not check_threshold(
+                data_invalid[rule.name], data_total[rule.name], rule.threshold
             ):
                 logging.error(
-                    f"{col} did not pass checks, so the file will be rejected."
+                    f"{rule.name} did not pass checks, so the file will be rejected."
                 )
                 file_pass = False
 
@@ -0,0 +1,251 @@
+import glob
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .apply_configuration import (
+    apply_transformation_from_config,
+    apply_validation_from_config,
+    check_configuration,
+    compile_config,
+)
+from .database import load_dataframe
+from .loader import SourceFile
+from .utils import copy_file
+
+
+def find_files(inbox, pattern="*"):
+    """
+    Finds the files to process, largest first so the longest running
+    files are started as early as possible
+
+    :inbox: a directory, or a glob pattern of files
+    :pattern: (optional) the pattern to match files in a directory
+    :returns: list of pathlib.Path objects
+    """
+    inbox = Path(inbox)
+    if inbox.is_dir():
+        files = inbox.glob(pattern)
+    else:
+        files = (Path(f) for f in glob.glob(str(inbox)))
+    files = [f for f in files if f.is_file()]
+    return sorted(files, key=lambda f: f.stat().st_size, reverse=True)
+
+
+def process_file(
+    config,
+    filepath,
+    pass_dir,
+    reject_dir,
+    output_dir=None,
+    memoize=False,
+    cache=None,
+    pool=None,
+    table=None,
+    store=None,
+    error_dir=None,
+    create=False,
+):
+    """
+    Validates and transforms a single file, then copies it to the
+    pass or reject folder. If the file can't be read or validated, or passes
+    validation but can't be transformed, written or loaded, it isn't known
+    to be the file's fault, so it's copied to the error folder rather than
+    being rejected.
+
+    :config: dictionary of the validation and transformation configuration,
+        or an ExecutionPlan
+    :filepath: pathlib.Path object to the file
+    :pass_dir: the folder to copy files which pass to
+    :reject_dir: the folder to copy files which fail to
+    :output_dir: (optional) the folder to write the transformed data to
+    :memoize: (optional) only call functions once for each distinct value,
+        reusing results from earlier files in the same process
+    :cache: (optional) FileCache to reuse files which have been read before
+    :pool: (optional) ConnectionPool of the database to load the transformed data to
+    :table: (optional) the name of the table to load the transformed data to
+    :store: (optional) RowStore to only process the rows which are new or
+        have changed since a file was last sent
+    :error_dir: (optional) the folder to copy files which couldn't be
+        processed to, otherwise they are left where they are
+    :create: (optional) create the table if it doesn't exist
+    :returns: dictionary of results for the file, with an 'error' describing
+        what went wrong, if anything did
+    """
+    start = time.perf_counter()
+    rows = 0
+    file_pass = False
+    error = None
+
+    # Check the config is valid before reading the file
+    if not check_configuration(config):
+        logging.error("Ill formed configuration file")
+        error = "Ill formed configuration file"
+    else:
+        try:
+            # Read only the columns needed, once for both the validation and transformation
+            source = SourceFile(filepath, config, cache=cache)
+            rows = len(source.data)
+            file_pass = bool(
+                apply_validation_from_config(
+                    config, source, memoize=memoize, store=store
+                )
+            )
+        except Exception as e:
+            logging.exception(f"Unable to validate {filepath.name}")
+            error = f"{type(e).__name__}: {e}"
+
+    # Only transform the file if it's valid
+    if file_pass:
+        try:
+            df = apply_transformation_from_config(
+                config, source, memoize=memoize, store=store
+            )
+            if output_dir is not None:
+                df.to_csv(Path(output_dir) / f"{filepath.stem}.csv", index=False)
+            if pool is not None:
+                load_dataframe(df, table, pool, create=create)
+        except Exception as e:
+            logging.exception(f"Unable to transform {filepath.name}")
+            error = f"{type(e).__name__}: {e}"
+
+    # Move the file to the right place
+    if error is None:
+        copy_file(filepath, pass_dir if file_pass else reject_dir)
+    elif error_dir is not None:
+        copy_file(filepath, error_dir)
+
+    return {
+        "file": filepath.name,
+        "pass": file_pass,
+        "error": error,
+        "rows": rows,
+        "bytes": filepath.stat().st_size,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def describe_result(result):
+    """
+    Describes the result of a file from process_file for the log
+    :returns: string
+    """
+    if result["error"] is not None:
+        verdict = f"error ({result['error']})"
+    else:
+        verdict = "pass" if result["pass"] else "reject"
+    return (
+        f"{result['file']}: {verdict} "
+        f"({result['rows']} rows in {result['seconds']:.2f}s)"
+    )
+
+
+def summarise_batch(results, seconds):
+    """
+    Creates a summary of the results of a batch of files
+
+    :results: list of dictionaries of results from process_file
+    :seconds: the total time taken for the batch
+    :returns: dictionary of the aggregate results
+    """
+    rows = sum(r["rows"] for r in results)
+    return {
+        "files": results,
+        "passed": sum(r["pass"] and r["error"] is None for r in results),
+        "rejected": sum(not r["pass"] and r["error"] is None for r in results),
+        "errors": sum(r["error"] is not None for r in results),
+        "rows": rows,
+        "bytes": sum(r["bytes"] for r in results),
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0,
+        "files_per_second": len(results) / seconds if seconds else 0,
+    }
+
+
+def run_batch(
+    config,
+    inbox,
+    pass_dir,
+    reject_dir,
+    output_dir=None,
+    pattern="*",
+    max_workers=None,
+    memoize=False,
+    cache=None,
+    pool=None,
+    table=None,
+    store=None,
+    error_dir=None,
+    create=False,
+):
+    """
+    Validates and transforms all the files in an inbox in parallel, copying
+    each to the pass or reject folder
+
+    :config: dictionary of the validation and transformation configuration,
+        or an ExecutionPlan
+    :inbox: a directory, or a glob pattern of files
+    :pass_dir: the folder to copy files which pass to
+    :reject_dir: the folder to copy files which fail to
+    :output_dir: (optional) the folder to write the transformed data to
+    :pattern: (optional) the pattern to match files in a directory
+    :max_workers: (optional) the number of processes to use
+    :memoize: (optional) only call functions once for each distinct value,
+        reusing results from earlier files in the same process
+    :cache: (optional) FileCache to reuse files which have been read before
+    :pool: (optional) ConnectionPool of the database to load the transformed
+        data to. Each process opens its own connections.
+    :table: (optional) the name of the table to load the transformed data to
+    :store: (optional) RowStore to only process the rows which are new or
+        have changed since a file was last sent. Processes which update the
+        store at the same time may each miss the other's rows.
+    :error_dir: (optional) the folder to copy files which couldn't be
+        processed to, otherwise they are left where they are
+    :create: (optional) create the table if it doesn't exist
+    :returns: dictionary summarising the batch
+    """
+    for folder in [pass_dir, reject_dir, output_dir, error_dir]:
+        if folder is not None:
+            Path(folder).mkdir(parents=True, exist_ok=True)
+
+    # Check the configuration once, rather than for every file
+    config = compile_config(config)
+
+    files = find_files(inbox, pattern)
+    logging.info(f"Processing {len(files)} files.")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                process_file,
+                config,
+                filepath,
+                pass_dir,
+                reject_dir,
+                output_dir,
+                memoize,
+                cache,
+                pool,
+                table,
+                store,
+                error_dir,
+                create,
+            )
+            for filepath in files
+        ]
+        results = [future.result() for future in futures]
+    summary = summarise_batch(results, time.perf_counter() - start)
+
+    # Log the results for each file and overall
+    for result in results:
+        logging.info(describe_result(result))
+    logging.info(
+        f"{summary['passed']} passed, {summary['rejected']} rejected and "
+        f"{summary['errors']} could not be processed. "
+        f"{summary['rows']} rows in {summary['seconds']:.2f}s "
+        f"({summary['rows_per_second']:.0f} rows/s)."
+    )
+
+    return summary
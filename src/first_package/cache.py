@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from .utils import SheetInfo
+
+
+class FileCache:
+    """
+    An on-disk cache of parsed files, stored in the Feather format so they can
+    be memory-mapped when read back. Entries are found from the hash of the
+    file contents and the read options, so a resent or renamed file still
+    uses the cache. Once the cache is larger than max_bytes, the least
+    recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_bytes=2**30):
+        """
+        :directory: the folder to store the cached files in
+        :max_bytes: (optional) the largest size of the cache on disk
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, filepath, read_options=None):
+        """
+        Creates the key for a file from its contents and the read options
+        :filepath: path to the source file
+        :read_options: (optional) dictionary of options used to read the file
+        :returns: hex digest string
+        """
+        h = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        h.update(repr(sorted((read_options or {}).items())).encode())
+        return h.hexdigest()
+
+    def paths(self, key):
+        """
+        Returns the paths of the data and file information for a key
+        """
+        return self.directory / f"{key}.feather", self.directory / f"{key}.json"
+
+    def get(self, key):
+        """
+        Returns the cached data for a key, or raises KeyError if there isn't any
+        :returns: tuple of the dataframe, a list of SheetInfo and a list of
+            all the headings in the file
+        """
+        from pyarrow import feather
+
+        data_path, sheets_path = self.paths(key)
+        try:
+            with open(sheets_path) as f:
+                info = json.load(f)
+            data = feather.read_table(data_path, memory_map=True).to_pandas()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+        # Mark the entry as recently used
+        os.utime(sheets_path)
+        sheets = [SheetInfo(*sheet) for sheet in info["sheets"]]
+        return data, sheets, info["headings"]
+
+    def set(self, key, data, sheets, headings):
+        """
+        Stores the data for a key, then removes old entries if the cache is full.
+        Data which can't be stored in the Feather format is not cached.
+        """
+        import pyarrow as pa
+        from pyarrow import feather
+
+        data_path, sheets_path = self.paths(key)
+        try:
+            table = pa.Table.from_pandas(data)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            logging.warning(f"Unable to cache data: {e}")
+            return
+
+        # Write to temporary files first, so other processes never see part of an entry
+        with tempfile.NamedTemporaryFile(dir=self.directory, delete=False) as f:
+            feather.write_feather(table, f.name, compression="uncompressed")
+        os.replace(f.name, data_path)
+        with tempfile.NamedTemporaryFile("w", dir=self.directory, delete=False) as f:
+            json.dump({"sheets": sheets, "headings": list(headings)}, f)
+        os.replace(f.name, sheets_path)
+
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in max_bytes
+        """
+        entries = []
+        total = 0
+        for sheets_path in self.directory.glob("*.json"):
+            data_path = sheets_path.with_suffix(".feather")
+            try:
+                size = sheets_path.stat().st_size + data_path.stat().st_size
+                last_used = sheets_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            entries.append((last_used, size, sheets_path, data_path))
+            total += size
+
+        for _, size, sheets_path, data_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logging.info(f"Removing {data_path.name} from the cache.")
+            for path in [sheets_path, data_path]:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    def clear(self):
+        """
+        Removes all the cached files
+        """
+        for path in list(self.directory.glob("*.feather")) + list(
+            self.directory.glob("*.json")
+        ):
+            path.unlink()
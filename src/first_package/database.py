@@ -0,0 +1,216 @@
+import contextlib
+import functools
+import itertools
+import logging
+import queue
+import sqlite3
+import threading
+
+import pandas as pd
+
+
+class ConnectionPool:
+    """
+    A pool of database connections, which are opened when first needed and
+    then reused. Any DB-API connection can be pooled. Only the settings are
+    kept when a pool is pickled, so each process opens its own connections.
+    """
+
+    def __init__(self, connect, size=4):
+        """
+        :connect: function which opens a new connection
+        :size: (optional) the most connections to have open at once
+        """
+        self.connect = connect
+        self.size = size
+        self.connections = queue.Queue(maxsize=size)
+        # A slot for each connection which can be borrowed at once
+        self.slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"connect": self.connect, "size": self.size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        """
+        Borrows a connection from the pool, waiting for one to be returned
+        if they are all in use. If anything goes wrong while it's borrowed,
+        the connection is closed rather than returned, as it may be broken.
+        :timeout: (optional) the seconds to wait for a connection
+        """
+        if not self.slots.acquire(timeout=timeout):
+            raise queue.Empty("No database connection was free in time")
+        try:
+            try:
+                connection = self.connections.get_nowait()
+            except queue.Empty:
+                connection = self.connect()
+                with self.lock:
+                    self.opened += 1
+        except BaseException:
+            self.slots.release()
+            raise
+
+        try:
+            yield connection
+        except BaseException:
+            self.discard(connection)
+            raise
+        else:
+            self.connections.put(connection)
+            self.slots.release()
+
+    def discard(self, connection):
+        """
+        Closes a borrowed connection instead of returning it to the pool,
+        so a new one is opened in its place
+        """
+        try:
+            connection.close()
+        except Exception as e:
+            logging.warning(f"Unable to close a database connection: {e}")
+        with self.lock:
+            self.opened -= 1
+        self.slots.release()
+
+    def close(self):
+        """
+        Closes all the connections which aren't in use
+        """
+        while True:
+            try:
+                connection = self.connections.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+            with self.lock:
+                self.opened -= 1
+
+
+def connect_sqlite(path, timeout=30.0):
+    """
+    Opens a connection to a SQLite database which can be shared by threads.
+    The database is put in write-ahead log mode, so loads don't block reads,
+    and a load waits for up to timeout seconds for any other to finish,
+    rather than failing because the database is locked.
+
+    :path: the path to the database file
+    :timeout: (optional) the seconds to wait for another connection's lock
+    :returns: sqlite3.Connection
+    """
+    connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    return connection
+
+
+def sqlite_pool(path, size=4, timeout=30.0):
+    """
+    Creates a pool of connections to a SQLite database
+    :path: the path to the database file
+    :size: (optional) the most connections to have open at once
+    :timeout: (optional) the seconds a load waits for another to finish
+    :returns: ConnectionPool
+    """
+    return ConnectionPool(
+        functools.partial(connect_sqlite, str(path), timeout=timeout), size
+    )
+
+
+# Column types to use when creating a table
+SQL_TYPES = {
+    "i": "INTEGER",
+    "u": "INTEGER",
+    "b": "INTEGER",
+    "f": "REAL",
+    "M": "TIMESTAMP",
+}
+
+
+def quote_name(name):
+    """
+    Quotes a table or column name for use in SQL
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def create_table(cursor, table, data):
+    """
+    Creates a table with columns to fit a dataframe, if it doesn't exist already
+    :cursor: a cursor of an open database connection
+    :table: the name of the table
+    :data: the dataframe to fit
+    """
+    columns = ", ".join(
+        f"{quote_name(column)} {SQL_TYPES.get(dtype.kind, 'TEXT')}"
+        for column, dtype in data.dtypes.items()
+    )
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {quote_name(table)} ({columns})")
+
+
+def to_records(data):
+    """
+    Converts the rows of a dataframe to tuples of python values, with None
+    for any missing values, as database drivers don't accept numpy types
+    :data: the dataframe to convert
+    :returns: iterator of tuples
+    """
+    values = data.astype(object)
+    # Timestamps become datetimes, which drivers know how to store
+    for column, dtype in data.dtypes.items():
+        if dtype.kind == "M":
+            values[column] = pd.Series(
+                data[column].dt.to_pydatetime(), index=data.index, dtype=object
+            )
+    values = values.where(data.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def load_dataframe(data, table, pool, batch_size=10000, placeholder="?", create=False):
+    """
+    Inserts the rows of a dataframe into a table, in batches, as a single
+    transaction. Either all of the rows are inserted, or none of them are.
+
+    :data: the dataframe to insert e.g. from apply_transformation_from_config
+    :table: the name of the table to insert into
+    :pool: ConnectionPool for the database
+    :batch_size: (optional) the number of rows to insert at once
+    :placeholder: (optional) the parameter placeholder of the database driver
+        e.g. "?" for sqlite3 or "%s" for psycopg2
+    :create: (optional) create the table if it doesn't exist
+    :returns: the number of rows inserted
+    """
+    columns = ", ".join(quote_name(column) for column in data.columns)
+    placeholders = ", ".join([placeholder] * len(data.columns))
+    sql = f"INSERT INTO {quote_name(table)} ({columns}) VALUES ({placeholders})"
+
+    records = to_records(data)
+    rows = 0
+    with pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            # sqlite3 only starts a transaction itself before an insert, so
+            # a table created for a load which fails would otherwise be kept
+            if getattr(connection, "in_transaction", None) is False:
+                cursor.execute("BEGIN")
+            if create:
+                create_table(cursor, table, data)
+            while True:
+                batch = list(itertools.islice(records, batch_size))
+                if not batch:
+                    break
+                cursor.executemany(sql, batch)
+                rows += len(batch)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    logging.info(f"Inserted {rows} rows into {table}.")
+    return rows
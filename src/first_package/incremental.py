@@ -0,0 +1,211 @@
+import importlib.metadata
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .plan import fingerprint
+from .reference_data import get_reference_versions
+
+try:
+    VERSION = importlib.metadata.version("test_package")
+except importlib.metadata.PackageNotFoundError:
+    VERSION = None
+
+
+def store_key(*parts):
+    """
+    Creates the key to store results under, from the parts of the plan the
+    results depend on. The package version is included, so results from
+    functions which have changed in a new version aren't reused, and so is
+    the version of each set of reference data, such as the eclass codes, as
+    any function could check values against them.
+    :parts: the parts of the plan e.g. a ValidationPlan
+    :returns: string of the hash of the parts
+    """
+    return fingerprint([VERSION, get_reference_versions(), *parts])
+
+
+def hash_rows(data):
+    """
+    Hashes the values of each row of a dataframe, ignoring the index
+    :data: the dataframe to hash
+    :returns: numpy array of uint64 hashes
+    """
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+
+class RowStore:
+    """
+    An on-disk store of the results for each row of the files which have been
+    processed, stored in the Parquet format. Results are found from the hash
+    of the values in a row, so when a file is resent with a few rows changed,
+    only those rows need processing again. Results are kept separately for
+    each key, so changing the configuration starts again.
+
+    The results for a key are a folder of parts, and each new set of results
+    is added as a new part, so nothing already stored is rewritten. Once
+    there are max_parts parts they are combined into one, keeping the most
+    recent max_rows rows, and only the max_keys most recently used keys are
+    kept.
+
+    Only results which depend on nothing but the values in the row and the
+    reference data can be stored. The keys include the version of the
+    reference data, so results aren't reused once it changes.
+    """
+
+    def __init__(self, directory, max_rows=1000000, max_parts=16, max_keys=16):
+        """
+        :directory: the folder to store the results in
+        :max_rows: (optional) the most rows to keep for each key
+        :max_parts: (optional) the most parts to keep for each key before
+            combining them
+        :max_keys: (optional) the most keys to keep results for
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_rows = max_rows
+        self.max_parts = max_parts
+        self.max_keys = max_keys
+
+    def path(self, key, kind):
+        """
+        Returns the folder of the results of a kind for a key
+        """
+        return self.directory / f"{key}.{kind}"
+
+    def parts(self, key, kind):
+        """
+        Returns the paths of the parts of the results, oldest first
+        """
+        return sorted(self.path(key, kind).glob("*.parquet"))
+
+    def read(self, parts):
+        """
+        Reads parts of the results, keeping the latest result for each hash
+        """
+        results = []
+        for part in parts:
+            try:
+                results.append(pd.read_parquet(part))
+            # eg. the parts were combined by another process
+            except FileNotFoundError:
+                continue
+        if not results:
+            return None
+        results = pd.concat(results, ignore_index=True).set_index("hash")
+        return results[~results.index.duplicated(keep="last")]
+
+    def get(self, key, kind):
+        """
+        Returns the stored results, indexed by the hash of each row, or None
+        if there aren't any
+        """
+        path = self.path(key, kind)
+        if not path.exists():
+            return None
+        # Record when the key was used, so the least recently used are evicted
+        os.utime(path)
+        return self.read(self.parts(key, kind))
+
+    def write(self, path, results):
+        """
+        Writes results as a new part in a folder
+        :returns: the path of the part
+        """
+        # Parts are named by the time they were written, so they sort in order
+        part = path / f"{time.time_ns():020d}-{os.getpid()}.parquet"
+        # Write to a temporary file first, so a partly written file is never read
+        fd, temp_path = tempfile.mkstemp(dir=path, suffix=".tmp")
+        os.close(fd)
+        try:
+            results.rename_axis("hash").reset_index().to_parquet(temp_path)
+            os.replace(temp_path, part)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return part
+
+    def set(self, key, kind, results):
+        """
+        Adds results, indexed by the hash of each row, to those already stored.
+        Results which can't be stored in the Parquet format are not stored.
+        """
+        path = self.path(key, kind)
+        path.mkdir(exist_ok=True)
+        try:
+            self.write(path, results)
+            parts = self.parts(key, kind)
+            if len(parts) >= self.max_parts:
+                self.combine(path, parts)
+        except Exception as e:
+            logging.warning(f"Could not store the {kind} results: {e}")
+        self.evict()
+
+    def combine(self, path, parts):
+        """
+        Combines parts of the results into one, keeping the most recent max_rows
+        """
+        results = self.read(parts)
+        if results is not None:
+            self.write(path, results.iloc[-self.max_rows :])
+        for part in parts:
+            part.unlink(missing_ok=True)
+
+    def evict(self):
+        """
+        Removes the results of the least recently used keys, leaving max_keys
+        """
+        paths = sorted(
+            (p for p in self.directory.iterdir() if p.is_dir()),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for path in paths[: max(len(paths) - self.max_keys, 0)]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def clear(self):
+        """
+        Removes all the stored results
+        """
+        for path in self.directory.iterdir():
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def apply_incremental(store, key, kind, data, function):
+    """
+    Applies a function to only the rows of a dataframe which aren't in the
+    store, and combines the results with those already stored. Rows with the
+    same values are only processed once.
+
+    :store: RowStore to look up and keep the results in
+    :key: the key of the results e.g. from store_key
+    :kind: the kind of results e.g. "validation"
+    :data: dataframe of the values the results depend on
+    :function: function which takes a dataframe of rows, and returns a
+        dataframe of results with the same index
+    :returns: dataframe of the results for each row of the data
+    """
+    hashes = hash_rows(data)
+    known = store.get(key, kind)
+    if known is None:
+        new = np.ones(len(data), dtype=bool)
+    else:
+        new = known.index.get_indexer(hashes) < 0
+
+    new_hashes, first = np.unique(hashes[new], return_index=True)
+    logging.info(f"Processing {len(new_hashes)} new rows out of {len(data)}.")
+    if len(new_hashes) > 0 or known is None:
+        results = function(data[new].iloc[first])
+        results.index = new_hashes
+        store.set(key, kind, results)
+        known = results if known is None else pd.concat([known, results])
+
+    results = known.loc[hashes]
+    results.index = data.index
+    return results
@@ -0,0 +1,181 @@
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from .plan import get_numeric_columns, get_plan, get_required_columns
+from .utils import SheetInfo, probe_worksheet
+
+
+def compact_dtypes(data, numeric_columns=(), max_unique_fraction=0.5):
+    """
+    Converts the columns of a dataframe to types which use less memory.
+    Text columns with few distinct values become categoricals, and the
+    numeric columns given become numbers where every value can be converted.
+    Their floats are stored in half the space where no value changes.
+    Other numbers keep the type they were read as, so values can't overflow,
+    and other text is left as it is, so e.g. "007" keeps its leading zeros.
+
+    :data: the dataframe to convert
+    :numeric_columns: (optional) the columns which should be numbers
+    :max_unique_fraction: (optional) the largest proportion of distinct
+        values for a text column to become a categorical
+    :returns: dataframe with the converted columns
+    """
+    data = data.copy()
+    for column in data.columns:
+        values = data[column]
+
+        if column in numeric_columns and values.dtype == object:
+            numbers = pd.to_numeric(values, errors="coerce")
+            if numbers.count() == values.count():
+                values = numbers
+
+        if column in numeric_columns and values.dtype == "float64":
+            smaller = values.astype("float32")
+            if np.array_equal(
+                smaller.to_numpy(dtype="float64"), values.to_numpy(), equal_nan=True
+            ):
+                values = smaller
+
+        if values.dtype == object and len(values) > 0:
+            if values.nunique() <= max_unique_fraction * len(values):
+                values = values.astype("category")
+
+        data[column] = values
+    return data
+
+
+class SourceFile:
+    """
+    A data file which is only read from disk once. It holds both the data and
+    the structure of the file, so the validation and transformation can share
+    them without going back to the file.
+    """
+
+    def __init__(
+        self, filepath, config=None, cache=None, numeric_columns=None, **read_options
+    ):
+        """
+        :filepath: path to a csv or excel file
+        :config: (optional) dictionary configuration or ExecutionPlan. If given,
+            only the columns it uses are read, and they are stored compactly.
+            Functions with a 'functiontype' of 'dataframe' then only see those
+            columns.
+        :cache: (optional) FileCache to reuse files which have been read before
+        :numeric_columns: (optional) the columns to store as numbers, where
+            every value is a number. Otherwise these are found from the config,
+            as the columns which are only used by numeric transformations.
+            The validators see these as numbers rather than the text in the
+            file, so only use this for columns which are only ever used as numbers.
+        :read_options: any additional arguments for the pandas reader
+        """
+        self.path = Path(filepath)
+        self.read_options = read_options
+        self.columns = None
+        self.memory_saved = 0
+
+        if config is not None:
+            plan = get_plan(config)
+            self.columns = sorted(get_required_columns(plan))
+            if numeric_columns is None:
+                numeric_columns = get_numeric_columns(plan)
+        self.numeric_columns = sorted(numeric_columns or ())
+
+        if cache is None:
+            self.data, self.sheets, self.headings = self.read()
+            return
+
+        key = cache.key(
+            self.path,
+            dict(read_options, columns=self.columns, numeric=self.numeric_columns),
+        )
+        try:
+            self.data, self.sheets, self.headings = cache.get(key)
+            logging.info(f"Using cached copy of {self.path.name}.")
+        except KeyError:
+            self.data, self.sheets, self.headings = self.read()
+            cache.set(key, self.data, self.sheets, self.headings)
+
+    def read(self):
+        """
+        Reads the data from the file
+        :returns: tuple of the dataframe, a list of SheetInfo and a list of
+            all the headings in the file
+        """
+        logging.info(f"Reading {self.path.name}.")
+        read_options = dict(self.read_options)
+        if self.columns is not None:
+            columns = set(self.columns)
+            read_options["usecols"] = lambda column: column in columns
+
+        if self.path.suffix.upper() == ".CSV":
+            data = pd.read_csv(self.path, **read_options)
+            sheets = [SheetInfo(self.path.stem, len(data) > 0, *data.shape)]
+            if self.columns is None:
+                headings = list(data.columns)
+            else:
+                # Only the headings are needed from the other columns
+                headings = list(pd.read_csv(self.path, nrows=0, **self.read_options))
+        else:
+            data, sheets, headings = self.read_excel(read_options)
+
+        if self.columns is not None:
+            data = self.compact(data)
+            logging.info(
+                f"Read {data.shape[1]} of {len(headings)} columns, "
+                f"saving {self.memory_saved / 2 ** 20:.1f}MB by compacting them."
+            )
+        return data, sheets, headings
+
+    def read_excel(self, read_options):
+        """
+        Reads the data from a workbook, and finds which sheets have data in
+        :read_options: dictionary of arguments for the pandas reader
+        :returns: tuple of the dataframe, a list of SheetInfo and a list of
+            all the headings in the sheet
+        """
+        read_options = dict(read_options)
+        sheet_name = read_options.pop("sheet_name", 0)
+
+        with pd.ExcelFile(self.path) as xl:
+            if hasattr(xl.book, "worksheets"):
+                # Workbooks opened by openpyxl can be streamed
+                sheets = [
+                    probe_worksheet(worksheet) for worksheet in xl.book.worksheets
+                ]
+                data = xl.parse(sheet_name=sheet_name, **read_options)
+            else:
+                # Otherwise each sheet has to be read, so keep the one needed
+                frames = {
+                    sheet: xl.parse(sheet_name=sheet, **read_options)
+                    for sheet in xl.sheet_names
+                }
+                sheets = [
+                    SheetInfo(sheet, len(df) > 0, *df.shape)
+                    for sheet, df in frames.items()
+                ]
+                if isinstance(sheet_name, int):
+                    sheet_name = xl.sheet_names[sheet_name]
+                data = frames[sheet_name]
+
+            if self.columns is None:
+                headings = list(data.columns)
+            else:
+                # Only the headings are needed from the other columns
+                options = dict(self.read_options, sheet_name=sheet_name, nrows=0)
+                headings = list(xl.parse(**options).columns)
+
+        return data, sheets, headings
+
+    def compact(self, data):
+        """
+        Converts the data to types which use less memory, and records how
+        much memory was saved
+        :data: the dataframe read from the file
+        :returns: dataframe with the converted columns
+        """
+        before = data.memory_usage(deep=True).sum()
+        data = compact_dtypes(data, self.numeric_columns)
+        self.memory_saved = int(before - data.memory_usage(deep=True).sum())
+        return data
@@ -0,0 +1,141 @@
+import collections
+import numpy as np
+import pandas as pd
+
+
+class ResultCache:
+    """
+    A cache of the results of calling functions with given values, which
+    removes the least recently used results once it is full. Functions are
+    assumed to always give the same result for the same values.
+    """
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.results = collections.OrderedDict()
+
+    def get(self, key):
+        """
+        Returns the cached result for a key, or raises KeyError if there isn't one
+        """
+        result = self.results[key]
+        self.results.move_to_end(key)
+        return result
+
+    def set(self, key, result):
+        """
+        Stores the result for a key, removing the oldest result if full
+        """
+        self.results[key] = result
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all the cached results
+        """
+        self.results.clear()
+
+
+# Cache shared by all files processed in this process
+DEFAULT_CACHE = ResultCache()
+
+
+# Stands in for NaN in cache keys, as NaN isn't equal to itself
+MISSING = object()
+
+
+def value_key(value):
+    """
+    Creates the part of a cache key for a value. The type is included, so
+    values which are equal but of different types, such as 1, 1.0 and True,
+    don't share results, and NaN is replaced so it can be found again.
+    """
+    try:
+        if value != value:
+            return type(value), MISSING
+    # eg. pd.NA, or values which compare element-wise
+    except (TypeError, ValueError):
+        pass
+    return type(value), value
+
+
+def factorize_column(column):
+    """
+    Identifies the distinct values in a column. Values which are equal but of
+    different types are kept apart, as are missing values of different types.
+
+    :column: series of values
+    :returns: tuple of an array of codes for each row, and a list of the
+        value for each code
+    """
+    codes, _ = pd.factorize(column)
+    if column.dtype == object:
+        type_codes, types = pd.factorize(column.map(type))
+        if len(types) > 1:
+            codes = codes * len(types) + type_codes
+    # Missing values have a code of -1, so are a distinct value of their own
+    _, first, codes = np.unique(codes, return_index=True, return_inverse=True)
+    return codes.reshape(-1), list(column.iloc[first])
+
+
+def factorize(columns):
+    """
+    Identifies the distinct values, or combinations of values, in a list of
+    columns.
+
+    :columns: list of series of the same length
+    :returns: tuple of an array of codes for each row, and a list of the
+        tuple of values for each code
+    """
+    codes_list = []
+    uniques_list = []
+    for column in columns:
+        codes, uniques = factorize_column(column)
+        codes_list.append(codes)
+        uniques_list.append(uniques)
+
+    if len(columns) == 1:
+        return codes_list[0], [(u,) for u in uniques_list[0]]
+
+    # Find the distinct combinations of values across the columns
+    combinations, codes = np.unique(
+        np.stack(codes_list, axis=1), axis=0, return_inverse=True
+    )
+    uniques = [
+        tuple(uniques_list[i][code] for i, code in enumerate(combination))
+        for combination in combinations
+    ]
+    return codes.reshape(-1), uniques
+
+
+def apply_unique(function, columns, kwargs=None, cache=DEFAULT_CACHE):
+    """
+    Applies a function to each row of one or more columns, but only calls
+    the function once for each distinct value or combination of values.
+    The values must be hashable.
+
+    :function: the function to apply, taking one value from each column
+    :columns: list of series of the same length
+    :kwargs: (optional) dictionary of keyword arguments for the function
+    :cache: (optional) ResultCache to reuse results from
+    :returns: series of the result for each row
+    """
+    kwargs = kwargs or {}
+    codes, uniques = factorize(columns)
+    kwargs_key = tuple((k, value_key(v)) for k, v in kwargs.items())
+
+    results = np.empty(len(uniques), dtype=object)
+    for i, args in enumerate(uniques):
+        key = (function, kwargs_key, tuple(value_key(v) for v in args))
+        try:
+            result = cache.get(key)
+        except KeyError:
+            result = function(*args, **kwargs)
+            cache.set(key, result)
+        except TypeError:
+            # The values can't be used as a key, so can't be cached
+            result = function(*args, **kwargs)
+        results[i] = result
+
+    return pd.Series(results[codes], index=columns[0].index).infer_objects()
@@ -0,0 +1,444 @@
+import collections.abc
+import functools
+import hashlib
+import re
+import types
+from typing import Any, Callable, NamedTuple, Optional, Pattern, Tuple, Union
+
+from .transformations import NUMERIC_TRANSFORMATIONS, get_row_number
+from .validators import compile_validator
+
+# The number of plans to keep in memory, with the functions they were made from
+PLAN_CACHE_SIZE = 64
+PLAN_CACHE = {}
+
+
+class ValidationColumn(NamedTuple):
+    name: Union[str, Tuple[str, ...]]
+    title: str
+    functions: Tuple[Callable, ...]
+    threshold: float
+    mandatory: bool
+
+
+class ValidationRule(NamedTuple):
+    name: str
+    function: Callable
+    # The columns the rule compares, in the order the function takes them
+    titles: Tuple[str, ...]
+    kwargs: Tuple[Tuple[str, Any], ...]
+    threshold: float
+    mandatory: bool
+
+
+class FileDatesPlan(NamedTuple):
+    data_field: str
+    min_file_date_regex: Pattern
+    max_file_date_regex: Pattern
+    grace_days: int
+
+
+class FileStructurePlan(NamedTuple):
+    multiple_sheets: bool
+
+
+class ValidationPlan(NamedTuple):
+    filename_pattern: Optional[Pattern]
+    filedates: Optional[FileDatesPlan]
+    filestructure: Optional[FileStructurePlan]
+    check_headings: bool
+    columns: Tuple[ValidationColumn, ...]
+    rules: Tuple[ValidationRule, ...] = ()
+
+
+class NodeInput(NamedTuple):
+    # The index of an earlier node, or None for a column of the source data
+    node: Optional[int]
+    # The column of the source data, or the position in the result of a node
+    # with several outputs, or None for the whole result of a node
+    column: Any
+
+
+class TransformationNode(NamedTuple):
+    function: Callable
+    inputs: Tuple[NodeInput, ...]
+    functiontype: str
+    kwargs: Tuple[Tuple[str, Any], ...]
+
+
+class TransformationPlan(NamedTuple):
+    # Nodes are in the order they need computing
+    nodes: Tuple[TransformationNode, ...]
+    # Each output column, and where its values come from
+    outputs: Tuple[Tuple[str, NodeInput], ...]
+
+
+class ExecutionPlan(NamedTuple):
+    name: Optional[str]
+    fingerprint: str
+    validation: Optional[ValidationPlan]
+    transformation: TransformationPlan
+
+
+def fingerprint(config):
+    """
+    Creates a fingerprint of a configuration, which is the same for any
+    configuration with the same settings and functions. Functions are
+    identified by their name, code, default arguments and the values they
+    enclose, so editing a function or making one with different values
+    changes the fingerprint.
+
+    :config: the dictionary configuration
+    :returns: string of the hash of the configuration
+    """
+    # The functions which are being described, so recursive ones can stop
+    describing = set()
+
+    def describe_const(const):
+        if isinstance(const, types.CodeType):
+            return describe_code(const)
+        # Sets are ordered by hash, which changes between processes
+        if isinstance(const, frozenset):
+            return repr(sorted(const, key=repr))
+        return repr(const)
+
+    def describe_code(code):
+        consts = ",".join(describe_const(c) for c in code.co_consts)
+        return f"code({code.co_code.hex()},[{consts}],{code.co_names!r})"
+
+    def describe_callable(value):
+        module = getattr(value, "__module__", None)
+        name = f"{module}.{getattr(value, '__qualname__', type(value).__qualname__)}"
+        if id(value) in describing:
+            return name
+        describing.add(id(value))
+        try:
+            if isinstance(value, functools.partial):
+                return f"partial({describe([value.func, value.args, value.keywords])})"
+            code = getattr(value, "__code__", None)
+            if code is not None:
+                closure = getattr(value, "__closure__", None) or ()
+                parts = [
+                    describe_code(code),
+                    describe(getattr(value, "__defaults__", None) or ()),
+                    describe(getattr(value, "__kwdefaults__", None) or {}),
+                    describe([cell_contents(cell) for cell in closure]),
+                ]
+                name += f"({','.join(parts)})"
+            # Objects which are called are identified by their settings
+            elif not isinstance(value, type) and hasattr(value, "__dict__"):
+                name += f"({describe(vars(value))})"
+            # Methods are identified by what they are bound to
+            bound = getattr(value, "__self__", None)
+            if bound is not None and not isinstance(bound, types.ModuleType):
+                name += f"[{bound!r}]"
+            return name
+        finally:
+            describing.discard(id(value))
+
+    def describe(value):
+        if isinstance(value, collections.abc.Mapping):
+            items = (f"{describe(k)}:{describe(v)}" for k, v in value.items())
+            return "{" + ",".join(items) + "}"
+        if isinstance(value, (list, tuple)):
+            return "[" + ",".join(describe(v) for v in value) + "]"
+        if isinstance(value, re.Pattern):
+            return f"re({value.pattern!r},{value.flags})"
+        if callable(value):
+            return describe_callable(value)
+        # Objects without a repr of their own are only identified by their type
+        if type(value).__repr__ is object.__repr__:
+            return f"{type(value).__module__}.{type(value).__qualname__}"
+        return repr(value)
+
+    return hashlib.sha256(describe(config).encode()).hexdigest()
+
+
+def cell_contents(cell):
+    """
+    Returns the value in a closure cell, or a marker if it's still empty
+    """
+    try:
+        return cell.cell_contents
+    except ValueError:
+        return "<empty>"
+
+
+def find_callables(value):
+    """
+    Finds every function in a configuration, in a fixed order
+    :value: the dictionary configuration, or any part of it
+    :returns: list of the functions
+    """
+    if isinstance(value, collections.abc.Mapping):
+        return [f for v in value.values() for f in find_callables(v)]
+    if isinstance(value, (list, tuple)):
+        return [f for v in value for f in find_callables(v)]
+    if callable(value):
+        return [value]
+    return []
+
+
+def build_validation_plan(meta):
+    """
+    Creates the validation part of an execution plan
+
+    :meta: the validation section of the configuration
+    :returns: ValidationPlan
+    """
+    filename = meta["check_filename"]
+    filedates = meta["check_filedates"]
+    filestructure = meta["check_filestructure"]
+
+    return ValidationPlan(
+        filename_pattern=(
+            re.compile(filename["pattern"]) if filename["validate"] else None
+        ),
+        filedates=(
+            FileDatesPlan(
+                data_field=filedates["data_field"],
+                min_file_date_regex=re.compile(filedates["min_file_date_regex"]),
+                max_file_date_regex=re.compile(filedates["max_file_date_regex"]),
+                grace_days=filedates["grace_days"],
+            )
+            if filedates["validate"]
+            else None
+        ),
+        filestructure=(
+            FileStructurePlan(multiple_sheets=filestructure["multiple_sheets"])
+            if filestructure["validate"]
+            else None
+        ),
+        check_headings=meta["check_headings"]["validate"],
+        columns=tuple(
+            ValidationColumn(
+                name=col,
+                title=criteria["title"],
+                functions=tuple(compile_validator(f) for f in criteria["functions"]),
+                threshold=criteria["threshold"],
+                mandatory=criteria["mandatory"],
+            )
+            for col, criteria in meta["columns"].items()
+        ),
+        rules=tuple(
+            ValidationRule(
+                name=name,
+                function=rule["function"],
+                titles=tuple(rule["data"]),
+                kwargs=tuple(rule.get("kwargs", {}).items()),
+                threshold=rule["threshold"],
+                mandatory=rule["mandatory"],
+            )
+            for name, rule in meta.get("rules", {}).items()
+        ),
+    )
+
+
+def build_transformation_plan(meta):
+    """
+    Creates the transformation part of an execution plan. The operations
+    are planned as a graph, so operations can use the outputs of earlier
+    ones, identical operations are only computed once, and operations
+    whose results are overwritten are never computed.
+
+    An operation with a 'source' of 'output' takes its 'data' from the
+    outputs of operations earlier in the configuration, rather than from
+    the source data.
+
+    :meta: the transformation section of the configuration
+    :returns: TransformationPlan
+    """
+    nodes = []
+    node_keys = {}
+    # Where the latest values of each output column come from
+    outputs = {}
+
+    for col, operations in meta["columns"].items():
+        for operation in operations:
+            source = operation.get("source", "input")
+            if source not in ("input", "output"):
+                raise ValueError(
+                    f"Transformation of {col} has a 'source' of {source!r}, "
+                    "rather than 'input' or 'output'"
+                )
+            if source == "output":
+                missing = [c for c in operation["data"] if c not in outputs]
+                if missing:
+                    raise ValueError(
+                        f"Transformation of {col} uses outputs {missing} "
+                        "which haven't been created by an earlier operation"
+                    )
+                inputs = tuple(outputs[c] for c in operation["data"])
+            else:
+                inputs = tuple(NodeInput(None, c) for c in operation["data"])
+
+            node = TransformationNode(
+                function=operation["function"],
+                inputs=inputs,
+                functiontype=operation["functiontype"],
+                kwargs=tuple(operation["kwargs"].items()),
+            )
+
+            # Reuse an identical node, if there is one
+            try:
+                index = node_keys.get(node)
+            except TypeError:
+                # The kwargs can't be compared, so the node can't be shared
+                index = None
+            if index is None:
+                index = len(nodes)
+                nodes.append(node)
+                try:
+                    node_keys[node] = index
+                except TypeError:
+                    pass
+
+            if isinstance(col, tuple):
+                for position, c in enumerate(col):
+                    outputs[c] = NodeInput(index, position)
+            else:
+                outputs[col] = NodeInput(index, None)
+
+    return prune_transformation(
+        TransformationPlan(tuple(nodes), tuple(outputs.items()))
+    )
+
+
+def prune_transformation(transformation, columns=None):
+    """
+    Removes the nodes of a transformation plan which aren't needed for
+    the given output columns
+
+    :transformation: TransformationPlan
+    :columns: (optional) list of the output columns needed, otherwise all of them
+    :returns: TransformationPlan
+    """
+    outputs = transformation.outputs
+    if columns is not None:
+        available = dict(outputs)
+        outputs = tuple((c, available[c]) for c in columns)
+
+    # Find every node the outputs depend on, working backwards
+    needed = set()
+    pending = [source.node for _, source in outputs if source.node is not None]
+    while pending:
+        index = pending.pop()
+        if index not in needed:
+            needed.add(index)
+            pending.extend(
+                source.node
+                for source in transformation.nodes[index].inputs
+                if source.node is not None
+            )
+
+    # Renumber the nodes which are kept
+    new_index = {index: i for i, index in enumerate(sorted(needed))}
+
+    def renumber(source):
+        if source.node is None:
+            return source
+        return NodeInput(new_index[source.node], source.column)
+
+    nodes = tuple(
+        node._replace(inputs=tuple(renumber(source) for source in node.inputs))
+        for index, node in enumerate(transformation.nodes)
+        if index in needed
+    )
+    return TransformationPlan(
+        nodes, tuple((c, renumber(source)) for c, source in outputs)
+    )
+
+
+def get_plan(config, key=None):
+    """
+    Returns the execution plan for a configuration, reusing the plan from
+    an earlier call where the configuration has the same fingerprint
+
+    :config: the dictionary configuration, or an ExecutionPlan
+    :key: (optional) the fingerprint of the configuration, if already known
+    :returns: ExecutionPlan
+    """
+    if isinstance(config, ExecutionPlan):
+        return config
+
+    if key is None:
+        key = fingerprint(config)
+    # Only reuse a plan made from the same function objects, as it holds them
+    functions = find_callables(config)
+    cached_functions, plan = PLAN_CACHE.get(key, ((), None))
+    if (
+        plan is None
+        or len(cached_functions) != len(functions)
+        or any(a is not b for a, b in zip(cached_functions, functions))
+    ):
+        plan = ExecutionPlan(
+            name=config.get("name"),
+            fingerprint=key,
+            validation=(
+                build_validation_plan(config["validation"])
+                if "validation" in config
+                else None
+            ),
+            transformation=(
+                build_transformation_plan(config["transformation"])
+                if "transformation" in config
+                else TransformationPlan((), ())
+            ),
+        )
+        # Remove the oldest plan if the cache is full
+        PLAN_CACHE.pop(key, None)
+        if len(PLAN_CACHE) >= PLAN_CACHE_SIZE:
+            del PLAN_CACHE[next(iter(PLAN_CACHE))]
+        PLAN_CACHE[key] = (functions, plan)
+    return plan
+
+
+def get_required_columns(config):
+    """
+    Finds the columns of the source data which a configuration uses, so
+    that only those columns need to be read
+
+    :config: the dictionary configuration, or an ExecutionPlan
+    :returns: set of column names
+    """
+    plan = get_plan(config)
+    columns = set()
+    if plan.validation is not None:
+        columns.update(column.title for column in plan.validation.columns)
+        for rule in plan.validation.rules:
+            columns.update(rule.titles)
+        if plan.validation.filedates is not None:
+            columns.add(plan.validation.filedates.data_field)
+    for node in plan.transformation.nodes:
+        columns.update(source.column for source in node.inputs if source.node is None)
+    return columns
+
+
+def get_numeric_columns(config):
+    """
+    Finds the columns of the source data which a configuration only uses
+    as numbers, so they can be stored as numbers. Columns which are validated
+    are left out, as the validators check the text in the file.
+
+    :config: the dictionary configuration, or an ExecutionPlan
+    :returns: set of column names
+    """
+    plan = get_plan(config)
+    columns = set()
+    others = set()
+    if plan.validation is not None:
+        others.update(column.title for column in plan.validation.columns)
+        for rule in plan.validation.rules:
+            others.update(rule.titles)
+        if plan.validation.filedates is not None:
+            others.add(plan.validation.filedates.data_field)
+    for node in plan.transformation.nodes:
+        # Functions given the whole dataframe could use any column as text
+        if node.functiontype == "dataframe" and node.function is not get_row_number:
+            return set()
+        used = {source.column for source in node.inputs if source.node is None}
+        if node.function in NUMERIC_TRANSFORMATIONS:
+            columns.update(used)
+        else:
+            others.update(used)
+    return columns - others
@@ -1,2 +1,124 @@
+import logging
+import pandas as pd
+import time
+from pathlib import Path
+
+
 def get_eclass_list():
     return ["ABC", "ABA", "000"]
+
+
+class ReferenceSet:
+    """
+    A set of codes to check values against. Codes from a file are loaded
+    the first time they are needed, and loaded again if the file changes.
+    """
+
+    def __init__(self, path=None, column=None, codes=None, check_interval=1.0):
+        """
+        :path: (optional) path to a CSV or Parquet file of codes
+        :column: (optional) the column of the file with the codes in,
+            otherwise the first column
+        :codes: (optional) list of codes to use instead of a file
+        :check_interval: (optional) the seconds between checks for changes to the file
+        """
+        self.path = Path(path) if path is not None else None
+        self.column = column
+        self.check_interval = check_interval
+        self.codes = pd.Index(codes, dtype=object) if codes is not None else None
+        self.file_version = None
+        self.last_checked = None
+
+    def read_codes(self):
+        """
+        Reads the codes from the file
+        :returns: pandas Index of the codes as strings
+        """
+        if self.path.suffix.upper() == ".PARQUET":
+            df = pd.read_parquet(
+                self.path, columns=[self.column] if self.column else None
+            )
+        else:
+            df = pd.read_csv(
+                self.path, usecols=[self.column] if self.column else None, dtype=str
+            )
+        codes = df[self.column] if self.column else df.iloc[:, 0]
+        return pd.Index(codes.dropna().astype(str).unique(), dtype=object)
+
+    def load(self):
+        """
+        Returns the codes, reading them from the file if it has changed
+        :returns: pandas Index of the codes
+        """
+        if self.path is None:
+            return self.codes
+
+        # Only look at the file every so often
+        now = time.monotonic()
+        if self.codes is not None and now - self.last_checked < self.check_interval:
+            return self.codes
+        self.last_checked = now
+
+        stat = self.path.stat()
+        file_version = (stat.st_mtime_ns, stat.st_size)
+        if self.codes is None or file_version != self.file_version:
+            logging.info(f"Loading reference data from {self.path.name}.")
+            self.codes = self.read_codes()
+            self.file_version = file_version
+        return self.codes
+
+    def version(self):
+        """
+        Returns a value which changes whenever the codes do
+        :returns: the modified time and size of the file the codes were
+            loaded from, or the codes themselves
+        """
+        codes = self.load()
+        if self.path is None:
+            return tuple(codes)
+        return self.file_version
+
+    def __contains__(self, code):
+        return code in self.load()
+
+    def isin(self, data):
+        """
+        Checks whether each value in a series is one of the codes
+        :data: series of values to check
+        :returns: boolean series
+        """
+        return data.astype(str).isin(self.load())
+
+
+# Reference data available to the validators
+REFERENCE_DATA = {"eclass": ReferenceSet(codes=get_eclass_list())}
+
+
+def set_reference_file(name, path, column=None):
+    """
+    Use the codes from a file for a type of reference data
+    :name: the name of the reference data e.g. "eclass"
+    :path: path to a CSV or Parquet file of codes
+    :column: (optional) the column of the file with the codes in
+    """
+    REFERENCE_DATA[name] = ReferenceSet(path, column=column)
+
+
+def get_reference(name):
+    """
+    Returns the reference data with a given name
+    :name: the name of the reference data e.g. "eclass"
+    :returns: ReferenceSet
+    """
+    return REFERENCE_DATA[name]
+
+
+def get_reference_versions():
+    """
+    Returns the version of all the reference data, so results which could
+    depend on it aren't reused once it changes
+    :returns: tuple of the name and version of each ReferenceSet
+    """
+    return tuple(
+        (name, REFERENCE_DATA[name].version()) for name in sorted(REFERENCE_DATA)
+    )
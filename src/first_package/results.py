@@ -0,0 +1,111 @@
+import numpy as np
+from typing import NamedTuple, Optional
+
+
+class ColumnResult(NamedTuple):
+    # Whether the column is within its threshold
+    passed: bool
+    # The invalid rows, as packed bits from np.packbits
+    invalid: np.ndarray
+    invalid_count: int
+    total: int
+    mandatory: Optional[bool] = None
+
+    def mask(self):
+        """
+        Returns the invalid rows of the column
+        :returns: boolean numpy array, True where the value is invalid
+        """
+        return np.unpackbits(self.invalid, count=self.total).astype(bool)
+
+
+def column_result(invalid, passed, mandatory=None):
+    """
+    Creates the result for a column from its invalid values
+    :invalid: boolean array or series, True where the value is invalid
+    :passed: whether the column is within its threshold
+    :mandatory: (optional) whether the column has to pass
+    :returns: ColumnResult
+    """
+    invalid = np.asarray(invalid, dtype=bool)
+    return ColumnResult(
+        passed=bool(passed),
+        invalid=np.packbits(invalid),
+        invalid_count=int(invalid.sum()),
+        total=len(invalid),
+        mandatory=mandatory,
+    )
+
+
+class ValidationResult:
+    """
+    The result of validating a file, with the rows which failed each column.
+    It is truthy when the file passed, so it can be used in place of the
+    True/False result.
+    """
+
+    def __init__(self, rows):
+        """
+        :rows: the number of rows in the data
+        """
+        self.rows = rows
+        self.passed = True
+        # The result of each file level check, by name
+        self.checks = {}
+        # The result of each column, by name
+        self.columns = {}
+        # Rows with no values at all, as packed bits
+        self.empty = np.packbits(np.zeros(rows, dtype=bool))
+
+    def __bool__(self):
+        return self.passed
+
+    def __repr__(self):
+        return (
+            f"ValidationResult(passed={self.passed}, rows={self.rows}, "
+            f"invalid={self.counts()})"
+        )
+
+    def add_check(self, name, passed):
+        """
+        Records the result of a file level check
+        """
+        self.checks[name] = bool(passed)
+
+    def add_column(self, name, result):
+        """
+        Records the result of a column
+        :name: the name of the column
+        :result: ColumnResult covering every row of the data
+        """
+        self.columns[name] = result
+
+    def counts(self):
+        """
+        Returns the number of invalid values in each column
+        :returns: dictionary of counts by column name
+        """
+        return {name: result.invalid_count for name, result in self.columns.items()}
+
+    def invalid_rows(self, columns=None, include_empty=True):
+        """
+        Finds the rows which are invalid in any of the given columns. The
+        packed bits are combined before unpacking, so this is cheap.
+
+        :columns: (optional) the columns to combine, otherwise the mandatory ones
+        :include_empty: (optional) count rows with no values at all as invalid
+        :returns: boolean numpy array, True where the row is invalid
+        """
+        if columns is None:
+            columns = [n for n, r in self.columns.items() if r.mandatory is not False]
+        combined = self.empty.copy() if include_empty else np.zeros_like(self.empty)
+        for name in columns:
+            combined |= self.columns[name].invalid
+        return np.unpackbits(combined, count=self.rows).astype(bool)
+
+    def valid_rows(self, columns=None, include_empty=True):
+        """
+        Finds the rows which are valid in all of the given columns
+        :returns: boolean numpy array, True where the row is valid
+        """
+        return ~self.invalid_rows(columns, include_empty)
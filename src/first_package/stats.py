@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pandas as pd
+
+
+def function_name(function):
+    """
+    Returns a readable name for a function
+    """
+    return getattr(function, "__qualname__", None) or repr(function)
+
+
+class Stats:
+    """
+    Records the time taken, rows processed, invalid values found and number
+    of calls for each stage of the validation and transformation. Stages are
+    named e.g. "validator.must_be_numeric" or "check_filename".
+    """
+
+    def __init__(self, callback=None):
+        """
+        :callback: (optional) function called with the name, seconds, rows and
+            invalid count each time a stage is recorded e.g. to send to a
+            metrics system
+        """
+        self.callback = callback
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, rows=0, invalid=None):
+        """
+        Adds a call of a stage to the stats
+        :name: the name of the stage
+        :seconds: the time the call took
+        :rows: (optional) the number of rows processed
+        :invalid: (optional) the number of invalid values found
+        """
+        with self.lock:
+            stage = self.stages.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "rows": 0, "invalid": 0}
+            )
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            stage["rows"] += rows
+            if invalid is not None:
+                stage["invalid"] += invalid
+        if self.callback is not None:
+            self.callback(name, seconds, rows, invalid)
+
+    def since(self, name, start, rows=0, invalid=None):
+        """
+        Records a call of a stage which started at a time from time.perf_counter()
+        """
+        self.record(name, time.perf_counter() - start, rows, invalid)
+
+    def clear(self):
+        """
+        Removes all the recorded stats
+        """
+        with self.lock:
+            self.stages.clear()
+
+    def to_frame(self):
+        """
+        Returns the stats as a dataframe, with the slowest stages first
+        :returns: dataframe with a row for each stage
+        """
+        with self.lock:
+            df = pd.DataFrame.from_dict(self.stages, orient="index")
+        if df.empty:
+            return df
+        df["rows_per_second"] = df["rows"] / df["seconds"].where(df["seconds"] > 0)
+        return df.sort_values("seconds", ascending=False)
@@ -2,6 +2,17 @@ import numpy as np
 import pandas as pd
 import re
 
+from .memoize import ResultCache
+from .utils import round_series
+
+# Patterns to find numbers in a UOM
+UOM_NUMBER = re.compile(r"^\d+(?:\.\d+)?$")
+UOM_NUMBER_TOKEN = re.compile(r"(?:^|\s)(\d+(?:\.\d+)?)(?=\s|$)")
+# Descriptions of UOMs, in the order of their category codes
+UOM_DESCRIPTIONS = ["Each", "Box"]
+# UOM strings which have already been seen, with their value and description code
+UOM_LOOKUP = ResultCache()
+
 
 def strip_whitespace(value):
     """
@@ -67,19 +78,18 @@ def identify_uom(uom):
         return None, None
     uom = str(uom)
     # Check for common values
-    if uom.lower() == "each":
+    uom_lower = uom.lower()
+    if uom_lower == "each":
         return 1, "Each"
-    elif uom.lower() == "pair":
+    elif uom_lower == "pair":
         return 2, "Box"
-    # Search for numbers
-    nums = re.compile(r"^\d+(?:\.\d+)?$")
-    numbers = [float(i) for i in uom.split() if nums.match(i)]
-    # if a number could be found, use that
-    if numbers:
-        uom_value = numbers[0]
-        if uom_value == 1:
-            return 1, "Each"
-        return uom_value, "Box"
+    # Search for the first number
+    for i in uom.split():
+        if UOM_NUMBER.match(i):
+            uom_value = float(i)
+            if uom_value == 1:
+                return 1, "Each"
+            return uom_value, "Box"
     # If a number couldn't be found return None, None
     return None, None
 
@@ -105,11 +115,162 @@ def get_numeric(value, decimal_place=None):
     return round(value, decimal_place)
 
 
-def get_row_number(df):
+def get_row_number(df, row_offset=0):
     """
     Returns a Series object with the row number on each line
 
     :df: The dataframe to create the series for
+    :row_offset: (optional) the number of rows before df, when it's one
+        chunk of a larger file
     :returns: Series
     """
-    return np.arange(df.shape[0]) + 1
+    return np.arange(df.shape[0]) + 1 + row_offset
+
+
+# =======================================================================
+# Series versions of the transformations above. These take whole columns
+# and are used with a 'functiontype' of 'series'.
+
+
+def _as_float(data):
+    """
+    Converts a series to floats in the same way as float()
+
+    :data: series of values to convert
+    :returns: series of floats, with NaN where it can't be converted
+    """
+    if pd.api.types.is_numeric_dtype(data):
+        return data.astype(float)
+    return pd.to_numeric(data.astype(str).str.strip(), errors="coerce").astype(float)
+
+
+def strip_whitespace_series(data):
+    """
+    Strips any whitespace from the start or end of each value
+
+    :data: series of values to strip
+    :returns: series of strings or None
+    """
+    result = data.astype(str).str.strip().astype(object)
+    # Keep blanks as None
+    result[data.isna()] = None
+    return result
+
+
+def calculate_total_series(price, qty):
+    """
+    Calculates price x qty for each row
+
+    :price: series of prices
+    :qty: series of quantities
+    :returns: series of floats, NaN where either can't be converted
+    """
+    return _as_float(price) * _as_float(qty)
+
+
+def remove_vat_series(data, rate=0.2):
+    """
+    Remove vat from each value
+
+    :data: series of values to remove VAT from
+    :returns: series of floats, NaN where it can't be converted
+    """
+    return get_numeric_series(data).astype(float) / (1 + rate)
+
+
+def parse_uom_series(data):
+    """
+    Identifies the UOM value and description code for each string in
+    a series of UOMs, with no blanks.
+
+    :data: series of strings to extract from
+    :returns: tuple of arrays of uom_value (float) and the code of the
+        uom_desc in UOM_DESCRIPTIONS (-1 where not found)
+    """
+    text = data.astype(str)
+    lower = text.str.lower()
+    # Find the first token that is a number
+    uom_value = pd.to_numeric(
+        text.str.extract(UOM_NUMBER_TOKEN, expand=False), errors="coerce"
+    ).to_numpy(dtype=float)
+    uom_desc = np.where(np.isnan(uom_value), -1, np.where(uom_value == 1, 0, 1))
+    # Check for common values
+    each = (lower == "each").to_numpy()
+    pair = (lower == "pair").to_numpy()
+    uom_value[each] = 1
+    uom_desc[each] = 0
+    uom_value[pair] = 2
+    uom_desc[pair] = 1
+    return uom_value, uom_desc
+
+
+def identify_uom_series(data, lookup=UOM_LOOKUP):
+    """
+    Identifies the UOM value and description for each string
+    in a series of UOMs. Each distinct string is only parsed the first time
+    it's seen, and looked up after that.
+
+    :data: series of strings to extract from
+    :lookup: (optional) ResultCache of UOM strings which have been seen before
+    :returns: dataframe of uom_value (float) and uom_desc (category)
+    """
+    codes, uniques = pd.factorize(data)
+    uniques = pd.Series(uniques).astype(str)
+
+    # Look up the UOMs which have already been seen
+    values = np.full(len(uniques), np.nan)
+    descs = np.full(len(uniques), -1)
+    unseen = []
+    for i, uom in enumerate(uniques):
+        try:
+            values[i], descs[i] = lookup.get(uom)
+        except KeyError:
+            unseen.append(i)
+
+    # Parse the new ones, and remember them
+    if unseen:
+        values[unseen], descs[unseen] = parse_uom_series(uniques.iloc[unseen])
+        for i in unseen:
+            lookup.set(uniques.iloc[i], (values[i], descs[i]))
+
+    # Blanks have a code of -1
+    blank = codes == -1
+    uom_value = values[codes]
+    uom_value[blank] = np.nan
+    uom_desc = descs[codes]
+    uom_desc[blank] = -1
+    return pd.DataFrame(
+        {
+            "uom_value": uom_value,
+            "uom_desc": pd.Categorical.from_codes(uom_desc, UOM_DESCRIPTIONS),
+        },
+        index=data.index,
+    )
+
+
+def get_numeric_series(data, decimal_place=None):
+    """
+    Converts each value to a numeric value
+
+    :data: series of strings containing the numbers to convert
+    :decimal_place: (optional) number of places to round to
+    :returns: series of numbers, NaN where it can't be converted
+    """
+    if pd.api.types.is_numeric_dtype(data) and not pd.api.types.is_bool_dtype(data):
+        values = data
+    else:
+        values = pd.to_numeric(data.astype(str).str.strip(), errors="coerce")
+    # If there is a request to round it, then do that
+    if pd.isna(decimal_place):
+        return values
+    return round_series(values, decimal_place)
+
+
+# Transformations which only use the values of their columns as numbers, so
+# the columns can be stored as numbers without changing the results
+NUMERIC_TRANSFORMATIONS = {
+    get_numeric,
+    get_numeric_series,
+    calculate_total,
+    calculate_total_series,
+}
@@ -1,7 +1,13 @@
 import datetime
 import logging
+import numpy as np
 import pandas as pd
 import shutil
+from typing import NamedTuple, Optional
+
+# Formats of dates which can be read without inferring the format
+DATE_FORMATS = ["%d/%m/%Y", "%Y-%m-%d", "%d%m%Y", "%d%m%y"]
+
 
 # Function to extract a date from a string
 def get_date(value):
@@ -12,7 +18,7 @@ def get_date(value):
     if pd.isna(value):
         return np.nan
     # Otherwise try to convert it using lots of formats
-    for date_format in ["%d/%m/%Y", "%Y-%m-%d", "%d%m%Y", "%d%m%y"]:
+    for date_format in DATE_FORMATS:
         value_as_date = pd.to_datetime(
             value, errors="coerce", format=date_format, exact=True
         )
@@ -20,6 +26,20 @@ def get_date(value):
         if not pd.isna(value_as_date):
             return value_as_date
     # If none of the known formats work, then try inferring it
+    return infer_date(value)
+
+
+# Function to extract a date from a string of an unknown format
+def infer_date(value):
+    """
+    Converts a value to a datetime object by inferring the format,
+    or NaT if it cannot identify a date from the string.
+    :value: the string to convert to datetime
+    :returns: datetime
+    """
+    # If it's already a datetime, then return that
+    if isinstance(value, datetime.datetime):
+        return value
     return pd.to_datetime(
         value,
         errors="coerce",
@@ -29,6 +49,58 @@ def get_date(value):
     )
 
 
+# Function to extract dates from a series of strings
+def get_date_series(data, sample_size=1000):
+    """
+    Converts a series of values to datetimes using the same formats as get_date.
+    The format which reads the most values in a sample is used for the whole
+    series first, and the other formats are only tried on the values left over.
+    If a value could be read by more than one format, the most common format
+    is used.
+    :data: the series to convert to datetime
+    :sample_size: (optional) the number of values to pick the format from
+    :returns: series of datetimes, with NaT where no date could be identified
+    """
+    if pd.api.types.is_datetime64_any_dtype(data):
+        return data
+
+    dates = np.full(len(data), np.datetime64("NaT"), dtype="datetime64[ns]")
+    remaining = data.notna().to_numpy()
+
+    # Order the formats by how many of the sample they can read
+    sample = data[remaining]
+    sample = sample.sample(min(sample_size, len(sample)), random_state=0)
+    found_in_sample = {
+        date_format: pd.to_datetime(
+            sample, errors="coerce", format=date_format, exact=True
+        )
+        .notna()
+        .sum()
+        for date_format in DATE_FORMATS
+    }
+    date_formats = sorted(DATE_FORMATS, key=lambda f: -found_in_sample[f])
+
+    for date_format in date_formats:
+        rows = np.flatnonzero(remaining)
+        if len(rows) == 0:
+            break
+        values_as_dates = pd.to_datetime(
+            data.iloc[rows], errors="coerce", format=date_format, exact=True
+        ).to_numpy()
+        found = ~np.isnat(values_as_dates)
+        dates[rows[found]] = values_as_dates[found]
+        remaining[rows[found]] = False
+
+    # If none of the known formats work, then try inferring it
+    rows = np.flatnonzero(remaining)
+    if len(rows) > 0:
+        dates[rows] = pd.to_datetime(
+            data.iloc[rows].map(infer_date), errors="coerce"
+        ).to_numpy()
+
+    return pd.Series(dates, index=data.index, name=data.name)
+
+
 # Function to extract a date from a string
 def get_date_ddmmyyyy(value):
     """
@@ -53,6 +125,28 @@ def get_date_ddmmyyyy(value):
     )
 
 
+# Function to extract dates from a series of strings
+def get_date_ddmmyyyy_series(data):
+    """
+    Converts a series of values to datetimes when they're in the form dd/mm/yyyy,
+    or NaT if it cannot identify a date from the string.
+    :data: the series to convert to datetime
+    :returns: series of datetimes
+    """
+    if pd.api.types.is_datetime64_any_dtype(data):
+        return data
+    dates = pd.to_datetime(data, errors="coerce", format="%d/%m/%Y", exact=True)
+    # Keep anything which is already a datetime
+    missing = dates.isna() & data.notna()
+    if missing.any():
+        dates[missing] = pd.to_datetime(
+            data[missing].map(
+                lambda x: x if isinstance(x, datetime.datetime) else pd.NaT
+            )
+        )
+    return dates
+
+
 # Function to identify the last day in a month
 def last_of_month(value):
     """
@@ -75,6 +169,90 @@ def first_of_month(value):
     return value.replace(day=1)
 
 
+# Function to round a series the same way as the builtin round
+def round_series(data, decimals):
+    """
+    Rounds every value in a series to the given number of decimal places,
+    giving exactly the same result as calling round() on each value.
+    numpy rounds by scaling, which can differ from round() on values that sit
+    on or next to a tie, so those values are rounded individually.
+    :data: the numeric series to round
+    :decimals: the number of decimal places to round to
+    :returns: series of rounded values
+    """
+    if not pd.api.types.is_float_dtype(data):
+        return data.round(decimals)
+    values = data.to_numpy(dtype=float)
+    rounded = np.round(values, decimals)
+    # Find the values where the scaled value is close to .5
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * 10.0 ** decimals
+        distance = np.abs(scaled - np.floor(scaled) - 0.5)
+        suspect = (distance <= 1e-9 * np.maximum(1.0, np.abs(scaled))) | (
+            np.isinf(scaled) & np.isfinite(values)
+        )
+    for i in np.flatnonzero(suspect):
+        rounded[i] = round(values[i], decimals)
+    return pd.Series(rounded, index=data.index, name=data.name)
+
+
+class SheetInfo(NamedTuple):
+    name: str
+    populated: bool
+    max_row: Optional[int]
+    max_column: Optional[int]
+
+
+# Function to find which sheets in a workbook have data in
+def probe_workbook(filepath):
+    """
+    Finds which sheets in a workbook have data in, without reading the whole
+    file. Sheets are streamed, and only read until their first row of data
+    below the headings. A sheet is populated when pd.read_excel would return
+    at least one row for it.
+    :filepath: a valid path to the workbook
+    :returns: list of SheetInfo
+    """
+    # Streaming is only possible for the newer file formats
+    if filepath.suffix.upper() not in [".XLSX", ".XLSM"]:
+        xl = pd.ExcelFile(filepath)
+        return [
+            SheetInfo(sheet, len(pd.read_excel(xl, sheet_name=sheet)) > 0, None, None)
+            for sheet in xl.sheet_names
+        ]
+
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        return [probe_worksheet(worksheet) for worksheet in workbook.worksheets]
+    finally:
+        workbook.close()
+
+
+# Function to find whether a sheet has data in
+def probe_worksheet(worksheet):
+    """
+    Finds whether an openpyxl worksheet has data in, reading only until
+    the first row of data below the headings.
+    :worksheet: the openpyxl worksheet
+    :returns: SheetInfo
+    """
+    # As in pd.read_excel, the first row is the headings even when it's blank,
+    # and any later row with values is data
+    populated = False
+    for row in worksheet.iter_rows(min_row=2, values_only=True):
+        if any(value is not None and value != "" for value in row):
+            populated = True
+            break
+    return SheetInfo(
+        worksheet.title,
+        populated,
+        worksheet.max_row,
+        worksheet.max_column,
+    )
+
+
 # Function to copy a file
 def copy_file(src, dest):
     """
@@ -1,16 +1,37 @@
+import collections.abc
 import datetime
 import logging
+import numpy as np
 import pandas as pd
 import re
-
-from .reference_data import get_eclass_list
-from .utils import get_date, get_date_ddmmyyyy, first_of_month, last_of_month
-
-LIST_ECLASS = get_eclass_list()
+import time
+
+from .memoize import apply_unique
+from .reference_data import get_reference
+from .results import column_result
+from .stats import function_name
+from .utils import (
+    get_date_ddmmyyyy,
+    get_date_ddmmyyyy_series,
+    get_date_series,
+    first_of_month,
+    last_of_month,
+    probe_workbook,
+    round_series,
+)
 
 # =======================================================================
 # Generic error checking
-def check_column(data, functions, threshold):
+def check_column(
+    data,
+    functions,
+    threshold,
+    fail_fast=False,
+    memoize=False,
+    stats=None,
+    return_result=False,
+    messages=None,
+):
     """
     Function to return a comment on how well populated a data series is
     based on a given threshold and function.
@@ -18,19 +39,147 @@ def check_column(data, functions, threshold):
     :data: the pandas dataframe column
     :functions: a list of the functions to apply to check a value is invalid
     :threshold: the threshold of population the column should have
+    :fail_fast: (optional) stop checking values once the result is certain
+    :memoize: (optional) only call functions once for each distinct value
+    :stats: (optional) Stats to record the time taken by each function
+    :return_result: (optional) return a ColumnResult with the invalid rows,
+        rather than True/False. Every value is checked, even with fail_fast.
+    :messages: (optional) list to add (level, message) tuples to, rather than
+        logging them
     :returns: dictionary of results
     """
 
+    if fail_fast and not return_result:
+        return check_column_fail_fast(
+            data, functions, threshold, memoize=memoize, stats=stats, messages=messages
+        )
+
     # Apply the functions to the column to return True/False values
-    data = data.map(lambda x: any(f(x) for f in functions)).copy()
-    # Identify the number of incorrect values
-    data_invalid = data.sum()
-    # Identify the number of values in the column
-    data_total = data.count()
+    data = find_invalid(data, functions, memoize=memoize, stats=stats)
+
+    # Compare the number of incorrect values to the threshold
+    return check_invalid(data, threshold, return_result, messages=messages)
+
+
+def check_column_with_messages(*args, **kwargs):
+    """
+    Runs check_column, returning its log messages rather than logging them,
+    so they can be logged in a fixed order e.g. when run by an executor
+    :returns: tuple of the result of check_column, and a list of
+        (level, message) tuples
+    """
+    messages = []
+    return check_column(*args, messages=messages, **kwargs), messages
+
+
+def report(messages, level, message):
+    """
+    Logs a message, or adds it to a list of messages to log later
+    :messages: list of (level, message) tuples, or None to log straight away
+    :level: the logging level e.g. logging.ERROR
+    :message: the message
+    """
+    if messages is None:
+        logging.log(level, message)
+    else:
+        messages.append((level, message))
+
+
+def check_column_fail_fast(
+    data,
+    functions,
+    threshold,
+    block_size=1024,
+    memoize=False,
+    stats=None,
+    messages=None,
+):
+    """
+    Checks a data series in blocks of increasing size, and stops as soon as
+    the number of invalid values found means the column will certainly pass
+    or fail. Gives the same result as check_column.
+
+    :data: the pandas dataframe column
+    :functions: a list of the functions to apply to check a value is invalid
+    :threshold: the threshold of population the column should have
+    :block_size: (optional) the number of values to check first
+    :memoize: (optional) only call functions once for each distinct value
+    :stats: (optional) Stats to record the time taken by each function
+    :messages: (optional) list to add (level, message) tuples to, rather than
+        logging them
+    :returns: True if the column passes, False otherwise
+    """
+
+    # Every value gets a True/False result, so the total is known up front
+    data_total = len(data)
+    data_invalid = 0
+    checked = 0
+
+    while checked < data_total:
+        block = find_invalid(
+            data.iloc[checked : checked + block_size],
+            functions,
+            memoize=memoize,
+            stats=stats,
+        )
+        checked += len(block)
+        data_invalid += int(block.sum())
+        data_valid = checked - data_invalid
+
+        if checked < data_total:
+            # It will fail, whatever the rest of the values are
+            if data_invalid / data_total > threshold:
+                report(
+                    messages,
+                    logging.INFO,
+                    f"Stopped checking after {checked} of {data_total} values.",
+                )
+                break
+            # It will pass, whatever the rest of the values are
+            if data_valid > 0 and (data_total - data_valid) / data_total <= threshold:
+                return True
+
+        block_size *= 2
+
+    return check_threshold(data_invalid, data_total, threshold, messages)
+
+
+def check_invalid(invalid, threshold, return_result=False, messages=None):
+    """
+    Checks whether the number of invalid values found in a column is within
+    a given threshold
+
+    :invalid: boolean series, True where the value is invalid
+    :threshold: the threshold of population the column should have
+    :return_result: (optional) return a ColumnResult with the invalid rows,
+        rather than True/False
+    :messages: (optional) list to add (level, message) tuples to, rather than
+        logging them
+    :returns: True if the column passes, False otherwise
+    """
+    passed = check_threshold(invalid.sum(), invalid.count(), threshold, messages)
+    if return_result:
+        return column_result(invalid, passed)
+    return passed
+
 
+def check_threshold(data_invalid, data_total, threshold, messages=None):
+    """
+    Checks whether the number of invalid values in a column is within
+    a given threshold.
+
+    :data_invalid: the number of invalid values in the column
+    :data_total: the number of values in the column
+    :threshold: the threshold of population the column should have
+    :messages: (optional) list to add (level, message) tuples to, rather than
+        logging them
+    :returns: True if the column passes, False otherwise
+    """
     if data_total == 0 or data_invalid == data_total:
         # If entire column is invalid or empty
-        logging.error("Header supplied, but all data invalid or missing.")
+        report(
+            messages, logging.ERROR, "Header supplied, but all data invalid or missing."
+        )
         return False
     else:
         # Find the percentage of invalid values
@@ -38,12 +187,128 @@ def check_column(data, functions, threshold):
 
         # Check whether the % invalid values is above or below the threshold
         if data_perc > threshold:
-            logging.error(f"{data_perc*100 : .2f}% of values are blank or invalid")
+            report(
+                messages,
+                logging.ERROR,
+                f"{data_perc*100 : .2f}% of values are blank or invalid",
+            )
             return False
 
     return True
 
 
+def check_rule(data, function, threshold, kwargs=None, stats=None, return_result=False):
+    """
+    Checks how many rows of a dataframe break a rule which compares several
+    columns, in the same way as check_column
+
+    :data: dataframe of the columns the rule compares, in the order it takes them
+    :function: function which takes a series for each column and returns a
+        boolean series, True where the row breaks the rule
+    :threshold: the proportion of rows which can break the rule
+    :kwargs: (optional) dictionary of keyword arguments for the function
+    :stats: (optional) Stats to record the time taken by the function
+    :return_result: (optional) return a ColumnResult with the invalid rows,
+        rather than True/False
+    :returns: True if the rule passes, False otherwise
+    """
+    data = find_rule_invalid(data, function, kwargs, stats=stats)
+    return check_invalid(data, threshold, return_result)
+
+
+def find_rule_invalid(data, function, kwargs=None, stats=None):
+    """
+    Finds the rows of a dataframe which break a rule comparing several columns
+
+    :data: dataframe of the columns the rule compares, in the order it takes them
+    :function: function which takes a series for each column and returns a
+        boolean series, True where the row breaks the rule
+    :kwargs: (optional) dictionary of keyword arguments for the function
+    :stats: (optional) Stats to record the time taken by the function
+    :returns: boolean series, True where the row breaks the rule
+    """
+    if stats is not None:
+        start = time.perf_counter()
+    # The rules compare the values themselves, rather than categories
+    columns = [data.iloc[:, i] for i in range(data.shape[1])]
+    columns = [
+        c.astype(object) if isinstance(c.dtype, pd.CategoricalDtype) else c
+        for c in columns
+    ]
+    invalid = function(*columns, **(kwargs or {}))
+    invalid = pd.Series(np.asarray(invalid, dtype=bool), index=data.index)
+    if stats is not None:
+        stats.since(
+            f"validator.{function_name(function)}", start, len(data), int(invalid.sum())
+        )
+    return invalid
+
+
+def find_invalid(data, functions, memoize=False, stats=None):
+    """
+    Finds the values in a data series that fail any of the given functions.
+    Functions with a series version in SERIES_VALIDATORS, or a series method
+    like SpecValidator, are applied to the whole column at once, any others
+    are applied to each value in turn.
+
+    :data: the pandas dataframe column
+    :functions: a list of the functions to apply to check a value is invalid
+    :memoize: (optional) only call the functions without a series version
+        once for each distinct value
+    :stats: (optional) Stats to record the time taken by each function
+    :returns: boolean series, True where the value is invalid
+    """
+    # Check each category once, then look up the result for each row
+    if isinstance(data.dtype, pd.CategoricalDtype):
+        values = pd.Series(data.cat.categories.append(pd.Index([np.nan])))
+        # Missing values have a code of -1, which is the last value
+        codes = data.cat.codes.to_numpy()
+        # The stats count the rows each category stands for
+        counts = np.bincount(codes % len(values), minlength=len(values))
+        invalid = _find_invalid(values, functions, memoize, stats, counts)
+        return pd.Series(invalid[codes], index=data.index)
+
+    return pd.Series(_find_invalid(data, functions, memoize, stats), index=data.index)
+
+
+def _find_invalid(data, functions, memoize=False, stats=None, counts=None):
+    """
+    Finds the values in a data series that fail any of the given functions
+
+    :counts: (optional) array of the number of rows each value stands for
+    :returns: boolean array, True where the value is invalid
+    """
+    # Each function only checks the values which haven't failed already, so
+    # later functions can rely on earlier ones e.g. check_empty
+    invalid = np.zeros(len(data), dtype=bool)
+    for f in functions:
+        rows = np.flatnonzero(~invalid)
+        if len(rows) == 0:
+            break
+        values = data if len(rows) == len(data) else data.iloc[rows]
+        if stats is not None:
+            start = time.perf_counter()
+        series_function = SERIES_VALIDATORS.get(f) or getattr(f, "series", None)
+        if series_function is not None:
+            result = series_function(values)
+        # Fall back to checking each value for any other functions
+        elif memoize:
+            result = apply_unique(f, [values])
+        else:
+            result = values.map(f)
+        result = np.asarray(result, dtype=bool)
+        if stats is not None:
+            failed = rows[result]
+            if counts is None:
+                checked, failed = len(values), len(failed)
+            else:
+                checked, failed = int(counts[rows].sum()), int(counts[failed].sum())
+            stats.since(f"validator.{function_name(f)}", start, checked, failed)
+        invalid[rows[result]] = True
+
+    return invalid
+
+
 def check_column_names(expected_headings, found_headings):
     """
     Confirms whether all headings in expected_headings are the same as found_headings
@@ -122,6 +387,28 @@ def check_filedates(config, data, filename):
     :returns: True if dates are within a grace period, False otherwise
     """
 
+    min_file_date, max_file_date = get_filename_dates(config, filename)
+    if min_file_date is None:
+        return False
+
+    # Convert the date column to datetime
+    data = get_date_series(data)
+    # Identify date range in the file
+    min_date = data.dropna().min()
+    max_date = data.dropna().max()
+
+    return check_daterange(config, min_date, max_date, min_file_date, max_file_date)
+
+
+def get_filename_dates(config, filename):
+    """
+    Identifies the first and last dates covered by a file from its filename
+
+    :config: A valid filedate checking configuration dictionary
+    :filename: A string of the filename to extract dates from
+    :returns: tuple of the min and max dates, or None, None if they can't be found
+    """
+
     min_file_date = re.match(config["min_file_date_regex"], filename)
     max_file_date = re.match(config["max_file_date_regex"], filename)
 
@@ -136,7 +423,7 @@ def check_filedates(config, data, filename):
 
         if pd.isna(min_file_date) or pd.isna(max_file_date):
             logging.error("Could not identify dates from filename.")
-            return False
+            return None, None
 
         logging.info(
             f"Date range from the filename is {min_file_date.strftime('%d/%m/%Y')} to {max_file_date.strftime('%d/%m/%Y')}"
@@ -147,18 +434,27 @@ def check_filedates(config, data, filename):
             min_file_date
         ) or max_file_date != last_of_month(max_file_date):
             logging.error("Dates in filename are not first and last of the month.")
-            return False
+            return None, None
     else:
         logging.error("Could not identify dates from filename.")
-        return False
+        return None, None
+
+    return min_file_date, max_file_date
 
-    # Convert the date column to datetime
-    data = data.map(get_date)
-    # Identify date range in the file
-    min_date = data.dropna().min()
-    max_date = data.dropna().max()
 
-    if not (min_date and max_date):
+def check_daterange(config, min_date, max_date, min_file_date, max_file_date):
+    """
+    Checks the range of dates found in the data matches the dates in the filename
+
+    :config: A valid filedate checking configuration dictionary
+    :min_date: the earliest date in the data
+    :max_date: the latest date in the data
+    :min_file_date: the first date from the filename
+    :max_file_date: the last date from the filename
+    :returns: True if dates are within a grace period, False otherwise
+    """
+
+    if pd.isna(min_date) or pd.isna(max_date):
         logging.error("Unable to read dates from the date column.")
         return False
     else:
@@ -182,12 +478,13 @@ def check_filedates(config, data, filename):
     return True
 
 
-def check_filestructure(filepath, config):
+def check_filestructure(filepath, config, sheets=None):
     """
     Check the file structure meets basic requirements
 
     :filepath: a valid path to the data file
     :config: additional configuration variables
+    :sheets: (optional) list of SheetInfo for the file, if it has already been read
     :returns: True if file passes checks
     """
     # Variable to keep track
@@ -201,15 +498,12 @@ def check_filestructure(filepath, config):
 
         # Check for multiple sheets
         logging.info("Checking for additional sheets.")
-        xl = pd.ExcelFile(filepath)
-        sheets = xl.sheet_names
+        if sheets is None:
+            sheets = probe_workbook(filepath)
 
         # If there are multiple sheets, then fail the file if there are more than 1 populated
         if len(sheets) > 1:
-            counter = 0
-            for sheet in sheets:
-                if len(pd.read_excel(xl, sheet_name=sheet)) > 0:
-                    counter += 1
+            counter = sum(sheet.populated for sheet in sheets)
             if counter > 1:
                 logging.error("Multiple sheets with data found.")
                 file_pass = False
@@ -359,7 +653,7 @@ def check_eclass(eclass):
     """
     eclass = str(eclass)
     # Should be a valid eclass
-    return eclass not in LIST_ECLASS
+    return eclass not in get_reference("eclass")
 
 
 # Find only digits & periods
@@ -374,3 +668,254 @@ def contains_only_digit_period(cell):
     if check_empty(cell):
         return True
     return not bool(re.match("^[\d\.]+$", str(cell)))
+
+
+# =======================================================================
+# Series versions of the validators above. These take a whole column and
+# return a boolean series, True where the value is invalid.
+
+
+def check_empty_series(data):
+    """
+    Returns true for each value that is null, false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    return data.isna()
+
+
+def must_be_valid_date_in_ddmmyyyy_series(data):
+    """
+    Returns true for each value that isn't a valid date, false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    return data.isna() | get_date_ddmmyyyy_series(data).isna()
+
+
+def must_contain_digit_series(data):
+    """
+    Returns true for each value that doesn't contain a digit, false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    return data.isna() | ~data.astype(str).str.contains(r"\d")
+
+
+def must_contain_letter_series(data):
+    """
+    Returns true for each value that doesn't contain a letter, false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    return data.isna() | ~data.astype(str).str.contains(r"[a-zA-Z]")
+
+
+def must_be_numeric_series(data):
+    """
+    Returns true for each value that is not numeric, false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    numbers = pd.to_numeric(data.astype(str), errors="coerce")
+    return data.isna() | numbers.isna()
+
+
+def must_be_alphanumeric_space_period_series(data):
+    """
+    Returns true for each value that contains anything other than
+    [a-zA-Z .0-9], false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    return data.isna() | ~data.astype(str).str.match(r"^[a-zA-Z .0-9]+$")
+
+
+def not_zero_pound_penny_series(data):
+    """
+    Returns true for each value that is not numeric, 0, 1, or 0.01,
+    false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    numbers = pd.to_numeric(data.astype(str), errors="coerce").astype(float)
+    numbers = round_series(numbers, 2)
+    return data.isna() | numbers.isna() | numbers.isin([0, 1, 0.01])
+
+
+def must_be_positive_series(data):
+    """
+    Returns true for each value that is not a positive numeric value,
+    false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    numbers = pd.to_numeric(data.astype(str), errors="coerce")
+    return numbers.isna() | (numbers <= 0)
+
+
+def check_total_series(price, qty, total):
+    """
+    Returns the difference between total and price * qty for each row
+    :price: series of prices to check
+    :qty: series of qtys to check
+    :total: series of totals to verify that price * qty = total
+    :returns: series of the absolute difference between price * qty and total
+    """
+    # Convert the values to numbers
+    price = pd.to_numeric(price, errors="coerce").astype(float)
+    qty = pd.to_numeric(qty, errors="coerce").astype(float)
+    total = pd.to_numeric(total, errors="coerce").astype(float)
+    # Only compare rows where none of the values are zero
+    difference = round_series((total - (price * qty)).abs(), 2)
+    return difference.where((price != 0) & (qty != 0) & (total != 0), 0.0)
+
+
+def check_eclass_series(data):
+    """
+    Returns true for each value that is not a valid eclass, false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    return ~get_reference("eclass").isin(data)
+
+
+def contains_only_digit_period_series(data):
+    """
+    Returns true for each value that contains values other than numbers and
+    periods, false otherwise
+    :data: series of values to check
+    :returns: boolean series
+    """
+    return data.isna() | ~data.astype(str).str.match(r"^[\d\.]+$")
+
+
+# =======================================================================
+# Rules which compare several columns. These take a series for each column
+# and return a boolean series, True where the row breaks the rule. Rows
+# missing any of the values are left to the checks of each column.
+
+
+def total_outside_variance_series(price, qty, total, variance_threshold=0):
+    """
+    Returns true for each row where total differs from price * qty by more
+    than the variance threshold, false otherwise
+    :price: series of prices to check
+    :qty: series of qtys to check
+    :total: series of totals to verify that price * qty = total
+    :variance_threshold: (optional) the largest difference allowed
+    :returns: boolean series
+    """
+    return check_total_series(price, qty, total) > variance_threshold
+
+
+def dates_out_of_order_series(earlier, later, allow_equal=True):
+    """
+    Returns true for each row where the earlier date is after the later
+    date, false otherwise
+    :earlier: series of dates which should come first
+    :later: series of dates which should come second
+    :allow_equal: (optional) whether the dates can be the same
+    :returns: boolean series
+    """
+    earlier = get_date_series(earlier)
+    later = get_date_series(later)
+    if allow_equal:
+        return earlier > later
+    return earlier >= later
+
+
+# =======================================================================
+# Validators built from declarative specs in the configuration
+
+
+# The keys a validator spec can have
+SPEC_KEYS = {"regex", "range", "in_set", "max_length"}
+
+
+class SpecValidator:
+    """
+    A validator built from a spec in the configuration, which checks a whole
+    column at once rather than calling a function for each value. The spec
+    is a dictionary of any of:
+        regex: a pattern each value must contain, use ^ and $ to match it all
+        range: [lo, hi], the inclusive bounds of a number, either can be None
+        in_set: a list of the values allowed
+        max_length: the most characters a value can have
+    A value is invalid if it is missing, or breaks any part of the spec.
+    """
+
+    def __init__(self, spec):
+        """
+        :spec: the dictionary spec from the configuration
+        """
+        if not spec or not set(spec) <= SPEC_KEYS:
+            raise ValueError(f"Validator spec must only use {sorted(SPEC_KEYS)}")
+        self.spec = dict(spec)
+        self.regex = re.compile(spec["regex"]) if "regex" in spec else None
+        self.range = tuple(spec["range"]) if "range" in spec else None
+        self.in_set = list(spec["in_set"]) if "in_set" in spec else None
+        self.max_length = spec.get("max_length")
+
+    def __repr__(self):
+        return f"SpecValidator({self.spec!r})"
+
+    def __call__(self, cell):
+        """
+        Returns true if a single value is invalid, false otherwise
+        """
+        return bool(self.series(pd.Series([cell], dtype=object)).iloc[0])
+
+    def series(self, data):
+        """
+        Returns true for each value that is invalid, false otherwise
+        :data: series of values to check
+        :returns: boolean series
+        """
+        invalid = data.isna()
+        text = data.astype(str)
+        if self.regex is not None:
+            invalid |= ~text.str.contains(self.regex)
+        if self.range is not None:
+            lo, hi = self.range
+            numbers = pd.to_numeric(data, errors="coerce")
+            invalid |= numbers.isna()
+            if lo is not None:
+                invalid |= numbers < lo
+            if hi is not None:
+                invalid |= numbers > hi
+        if self.in_set is not None:
+            # Values are usually read as text, so compare them as text too
+            allowed = {str(value) for value in self.in_set}
+            invalid |= ~(data.isin(self.in_set) | text.isin(allowed))
+        if self.max_length is not None:
+            invalid |= text.str.len() > self.max_length
+        return invalid
+
+
+def compile_validator(validator):
+    """
+    Compiles a validator spec from the configuration, so it can be applied
+    like any other validator. Functions are returned as they are.
+
+    :validator: a validator function, or a dictionary spec
+    :returns: callable validator
+    """
+    if isinstance(validator, collections.abc.Mapping):
+        return SpecValidator(validator)
+    return validator
+
+
+# Validators which check_column can apply to a whole column at once
+SERIES_VALIDATORS = {
+    check_empty: check_empty_series,
+    must_be_valid_date_in_ddmmyyyy: must_be_valid_date_in_ddmmyyyy_series,
+    must_contain_digit: must_contain_digit_series,
+    must_contain_letter: must_contain_letter_series,
+    must_be_numeric: must_be_numeric_series,
+    must_be_alphanumeric_space_period: must_be_alphanumeric_space_period_series,
+    not_zero_pound_penny: not_zero_pound_penny_series,
+    must_be_positive: must_be_positive_series,
+    check_eclass: check_eclass_series,
+    contains_only_digit_period: contains_only_digit_period_series,
+}
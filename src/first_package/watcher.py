@@ -0,0 +1,344 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from .apply_configuration import compile_config
+from .batch import describe_result, find_files, process_file
+
+
+class InboxWatcher:
+    """
+    A long running service which watches an inbox folder, and validates and
+    transforms each file soon after it arrives, copying it to the pass or
+    reject folder. A file is only processed once its size and modified time
+    have stopped changing, so partly written files are left until they're
+    complete. Files wait in a bounded queue, so the inbox is only scanned as
+    fast as the workers can keep up, and a file which is sent again is
+    processed again.
+
+    The files which have been processed are kept in a state file, so they
+    aren't processed again when the watcher is restarted. A file which can't
+    be processed, or whose result has an error, is tried again later, waiting
+    twice as long each time, until it has failed max_attempts times. If the
+    process pool breaks, e.g. because a worker was killed, a new one is started.
+    """
+
+    def __init__(
+        self,
+        config,
+        inbox,
+        pass_dir,
+        reject_dir,
+        output_dir=None,
+        pattern="*",
+        max_workers=4,
+        queue_size=100,
+        settle_seconds=2.0,
+        poll_seconds=1.0,
+        on_result=None,
+        state_file=None,
+        retry_seconds=60.0,
+        max_attempts=5,
+        **process_options,
+    ):
+        """
+        :config: dictionary of the validation and transformation configuration,
+            or an ExecutionPlan
+        :inbox: the folder to watch
+        :pass_dir: the folder to copy files which pass to
+        :reject_dir: the folder to copy files which fail to
+        :output_dir: (optional) the folder to write the transformed data to
+        :pattern: (optional) the pattern to match files in the inbox
+        :max_workers: (optional) the most files to process at once
+        :queue_size: (optional) the most files to have waiting to be processed
+        :settle_seconds: (optional) how long a file has to be unchanged
+            before it's processed
+        :poll_seconds: (optional) how often to scan the inbox
+        :on_result: (optional) function called with the dictionary of results
+            from process_file each time a file is processed
+        :state_file: (optional) the JSON file to keep the processed files in,
+            otherwise .<inbox>.processed.json next to the inbox
+        :retry_seconds: (optional) how long to wait before trying a file
+            which couldn't be processed again
+        :max_attempts: (optional) the most times to try to process a file
+        :process_options: any additional arguments for process_file e.g.
+            memoize, cache, pool, table, create or store
+        """
+        # Check the configuration once, rather than for every file
+        self.config = compile_config(config)
+        self.inbox = Path(inbox)
+        self.pass_dir = pass_dir
+        self.reject_dir = reject_dir
+        self.output_dir = output_dir
+        self.pattern = pattern
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        self.on_result = on_result
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.process_options = process_options
+        if state_file is None:
+            state_file = self.inbox.parent / f".{self.inbox.name}.processed.json"
+        self.state_file = Path(state_file)
+
+        # The size and modified time of each file, and when they last changed
+        self.pending = {}
+        # Files which are waiting or being processed
+        self.active = set()
+        # The size and modified time of each file when it was processed
+        self.processed = self.load_processed()
+        # The size and modified time of each file which failed, how many
+        # times it has failed and when to try it again
+        self.failed = {}
+        self.queue = None
+        self.stopping = None
+        self.executor = None
+        self.own_executor = False
+
+    def stop(self):
+        """
+        Stops scanning the inbox. The files already waiting are still processed.
+        """
+        if self.stopping is not None:
+            self.stopping.set()
+
+    def load_processed(self):
+        """
+        Reads the files which were processed before the watcher was started
+        :returns: dictionary of the size and modified time of each file
+        """
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Unable to read {self.state_file}, starting again: {e}")
+            return {}
+        return {
+            Path(filepath): tuple(signature) for filepath, signature in state.items()
+        }
+
+    def save_processed(self):
+        """
+        Writes the files which have been processed to the state file
+        """
+        state = {str(filepath): list(sig) for filepath, sig in self.processed.items()}
+        # Write to a temporary file first, so a partly written file is never read
+        temp_path = self.state_file.with_name(self.state_file.name + ".tmp")
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_file)
+        except OSError as e:
+            logging.warning(f"Unable to save {self.state_file}: {e}")
+
+    def find_ready(self):
+        """
+        Scans the inbox for files which haven't changed for settle_seconds,
+        and haven't been processed in their current state
+        :returns: list of pathlib.Path objects with their size and modified time
+        """
+        now = time.monotonic()
+        found = set()
+        ready = []
+        for filepath in find_files(self.inbox, self.pattern):
+            try:
+                stat = filepath.stat()
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            found.add(filepath)
+            if filepath in self.active or self.processed.get(filepath) == signature:
+                continue
+            # Wait to try files which failed again, unless they've changed
+            failed_signature, _, retry_at = self.failed.get(filepath, (None, 0, 0))
+            if signature == failed_signature and now < retry_at:
+                continue
+            # Start the wait again whenever the file changes
+            last_signature, since = self.pending.get(filepath, (None, now))
+            if signature != last_signature:
+                self.pending[filepath] = (signature, now)
+            elif now - since >= self.settle_seconds:
+                del self.pending[filepath]
+                ready.append((filepath, signature))
+
+        # Forget files which have been removed from the inbox
+        for filepath in set(self.pending) - found:
+            del self.pending[filepath]
+        for filepath in set(self.failed) - found:
+            del self.failed[filepath]
+        removed = set(self.processed) - found
+        for filepath in removed:
+            del self.processed[filepath]
+        if removed:
+            self.save_processed()
+        return ready
+
+    async def scan(self):
+        """
+        Scans the inbox until stopped, adding files which are ready to the queue.
+        Waits while the queue is full.
+        """
+        while not self.stopping.is_set():
+            for filepath, signature in self.find_ready():
+                self.active.add(filepath)
+                await self.queue.put((filepath, signature))
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def work(self):
+        """
+        Processes files from the queue, one at a time
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            filepath, signature = await self.queue.get()
+            executor = self.executor
+            try:
+                result = await loop.run_in_executor(
+                    executor,
+                    functools.partial(
+                        process_file,
+                        self.config,
+                        filepath,
+                        self.pass_dir,
+                        self.reject_dir,
+                        output_dir=self.output_dir,
+                        **self.process_options,
+                    ),
+                )
+            except BrokenProcessPool:
+                logging.exception(f"Unable to process {filepath.name}")
+                self.record_failure(filepath, signature)
+                self.replace_executor(executor)
+            except Exception:
+                logging.exception(f"Unable to process {filepath.name}")
+                self.record_failure(filepath, signature)
+            else:
+                logging.info(describe_result(result))
+                if result["error"] is None:
+                    self.failed.pop(filepath, None)
+                    self.processed[filepath] = signature
+                    self.save_processed()
+                else:
+                    self.record_failure(filepath, signature)
+                if self.on_result is not None:
+                    try:
+                        self.on_result(result)
+                    except Exception:
+                        logging.exception(f"Unable to report on {filepath.name}")
+            finally:
+                self.active.discard(filepath)
+                self.queue.task_done()
+
+    def replace_executor(self, broken):
+        """
+        Starts a new process pool in place of one which has broken, so the
+        files after it can still be processed
+        :broken: the executor which broke
+        """
+        # Each worker using the broken pool finds out, but only one replaces it
+        if self.executor is not broken:
+            return
+        logging.warning("The process pool broke, so starting a new one.")
+        if self.own_executor:
+            broken.shutdown(wait=False)
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.own_executor = True
+
+    def record_failure(self, filepath, signature):
+        """
+        Records a file which couldn't be processed, so it's tried again later,
+        or not at all once it has failed max_attempts times
+        :filepath: pathlib.Path object to the file
+        :signature: the size and modified time of the file when it failed
+        """
+        failed_signature, attempts, _ = self.failed.get(filepath, (None, 0, 0))
+        attempts = attempts + 1 if signature == failed_signature else 1
+        if attempts >= self.max_attempts:
+            logging.error(
+                f"Giving up on {filepath.name} after {attempts} attempts, "
+                "until it changes."
+            )
+            self.failed.pop(filepath, None)
+            self.processed[filepath] = signature
+            self.save_processed()
+            return
+        wait = self.retry_seconds * 2 ** (attempts - 1)
+        self.failed[filepath] = (signature, attempts, time.monotonic() + wait)
+        logging.info(f"Trying {filepath.name} again in {wait:g}s.")
+
+    async def run(self, executor=None):
+        """
+        Watches the inbox until stop is called, then waits for the files
+        already in the queue to finish
+
+        :executor: (optional) the executor to run process_file in, otherwise
+            a pool of max_workers processes. A process pool which breaks is
+            replaced by one of max_workers processes.
+        """
+        error_dir = self.process_options.get("error_dir")
+        for folder in [self.pass_dir, self.reject_dir, self.output_dir, error_dir]:
+            if folder is not None:
+                Path(folder).mkdir(parents=True, exist_ok=True)
+
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.stopping = asyncio.Event()
+        self.own_executor = executor is None
+        if self.own_executor:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.executor = executor
+
+        workers = [asyncio.create_task(self.work()) for _ in range(self.max_workers)]
+        logging.info(f"Watching {self.inbox} for files.")
+        try:
+            await self.scan()
+            # Finish the files which are waiting, before stopping the workers
+            logging.info(f"Stopping once {self.queue.qsize()} waiting files are done.")
+            await self.queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if self.own_executor:
+                self.executor.shutdown()
+        logging.info("Stopped watching.")
+
+
+def watch_inbox(config, inbox, pass_dir, reject_dir, **options):
+    """
+    Runs an InboxWatcher until the process is interrupted or terminated.
+    Files already waiting are finished before it returns.
+
+    :config: dictionary of the validation and transformation configuration,
+        or an ExecutionPlan
+    :inbox: the folder to watch
+    :pass_dir: the folder to copy files which pass to
+    :reject_dir: the folder to copy files which fail to
+    :options: any additional arguments for InboxWatcher
+    """
+    watcher = InboxWatcher(config, inbox, pass_dir, reject_dir, **options)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for signum in [signal.SIGINT, signal.SIGTERM]:
+            try:
+                loop.add_signal_handler(signum, watcher.stop)
+            # eg. signal handlers aren't supported on Windows
+            except NotImplementedError:
+                pass
+        await watcher.run()
+
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+import pandas as pd
+import pytest
+
+from first_package import (
+    calculate_total_series,
+    check_empty,
+    get_numeric_series,
+    get_row_number,
+    must_be_numeric,
+    must_be_positive,
+    must_contain_letter,
+)
+
+HEADINGS = ["SUPPLIER", "DESC", "PRICE", "QTY"]
+
+
+@pytest.fixture
+def config():
+    """
+    A small configuration, with the file level checks turned off
+    """
+    return {
+        "name": "test",
+        "validation": {
+            "check_filename": {"validate": False, "pattern": ".*"},
+            "check_filedates": {"validate": False},
+            "check_filestructure": {"validate": False, "multiple_sheets": False},
+            "check_headings": {"validate": True},
+            "columns": {
+                "SUPPLIER": {
+                    "title": "SUPPLIER",
+                    "functions": [must_contain_letter],
+                    "threshold": 0,
+                    "mandatory": True,
+                },
+                "DESC": {
+                    "title": "DESC",
+                    "functions": [check_empty],
+                    "threshold": 0,
+                    "mandatory": False,
+                },
+                "PRICE": {
+                    "title": "PRICE",
+                    "functions": [must_be_numeric],
+                    "threshold": 0,
+                    "mandatory": True,
+                },
+                "QTY": {
+                    "title": "QTY",
+                    "functions": [must_be_positive],
+                    "threshold": 0,
+                    "mandatory": True,
+                },
+            },
+        },
+        "transformation": {
+            "columns": {
+                "price": [
+                    {
+                        "function": get_numeric_series,
+                        "data": ["PRICE"],
+                        "functiontype": "series",
+                        "kwargs": {"decimal_place": 2},
+                    }
+                ],
+                "total": [
+                    {
+                        "function": calculate_total_series,
+                        "data": ["PRICE", "QTY"],
+                        "functiontype": "series",
+                        "kwargs": {},
+                    }
+                ],
+                "row": [
+                    {
+                        "function": get_row_number,
+                        "data": [],
+                        "functiontype": "dataframe",
+                        "kwargs": {},
+                    }
+                ],
+            }
+        },
+    }
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "SUPPLIER": ["Acme", "Acme", "Widgets Ltd"],
+            "DESC": ["Shears", None, "Gloves"],
+            "PRICE": ["1.50", "2", "3.25"],
+            "QTY": ["4", "1", "2"],
+        }
+    )
+
+
+@pytest.fixture
+def write_file(tmp_path):
+    """
+    Writes a dataframe to a csv file in an inbox folder
+    """
+
+    def write(df, name="supplier.csv"):
+        inbox = tmp_path / "inbox"
+        inbox.mkdir(exist_ok=True)
+        path = inbox / name
+        df.to_csv(path, index=False)
+        return path
+
+    return write
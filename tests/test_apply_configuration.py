@@ -0,0 +1,107 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from first_package import (
+    apply_transformation_from_config,
+    apply_validation_from_chunks,
+    apply_validation_from_config,
+    check_configuration,
+    compile_config,
+    get_numeric_series,
+)
+
+
+def chunks(df, size):
+    return [df.iloc[i : i + size] for i in range(0, len(df), size)]
+
+
+@pytest.mark.parametrize("price", ["1.5", "x"])
+def test_validating_chunks_matches_validating_the_whole_file(config, data, price):
+    data.loc[2, "PRICE"] = price
+    path = Path("supplier.csv")
+    expected = apply_validation_from_config(config, data, path)
+    assert expected == (price != "x")
+    assert apply_validation_from_chunks(config, chunks(data, 2), path) == expected
+
+
+def test_executor_logs_columns_in_the_order_of_the_config(config, data, caplog):
+    data.loc[0, "PRICE"] = "x"
+    logs = []
+    for executor in [None, ThreadPoolExecutor(4)]:
+        caplog.clear()
+        with caplog.at_level(logging.INFO):
+            result = apply_validation_from_config(
+                config, data, "supplier.csv", executor=executor
+            )
+        assert not result
+        logs.append(caplog.messages)
+    assert logs[0] == logs[1]
+
+
+@pytest.mark.parametrize("column", ["SUPPLIER", "PRICE", "DESC"])
+def test_fail_fast_gives_the_same_result(config, data, column):
+    data.loc[1, column] = None
+    path = Path("supplier.csv")
+    expected = apply_validation_from_config(config, data, path)
+    assert apply_validation_from_config(config, data, path, fail_fast=True) == expected
+
+
+def operation(function, data, functiontype="series", **options):
+    return dict(function=function, data=data, functiontype=functiontype, **options)
+
+
+def test_identical_operations_are_only_computed_once(data):
+    calls = []
+
+    def numbers(values):
+        calls.append(len(values))
+        return pd.to_numeric(values)
+
+    config = {
+        "transformation": {
+            "columns": {
+                "price": [operation(numbers, ["PRICE"], kwargs={})],
+                "also_price": [operation(numbers, ["PRICE"], kwargs={})],
+            }
+        }
+    }
+    result = apply_transformation_from_config(config, data)
+    assert result["price"].tolist() == result["also_price"].tolist()
+    assert calls == [3]
+
+
+def test_operations_can_use_earlier_outputs(data):
+    config = {
+        "transformation": {
+            "columns": {
+                "price": [operation(get_numeric_series, ["PRICE"], kwargs={})],
+                "double": [
+                    operation(lambda p: p * 2, ["price"], kwargs={}, source="output")
+                ],
+            }
+        }
+    }
+    result = apply_transformation_from_config(config, data)
+    assert result["double"].tolist() == [3.0, 4.0, 6.5]
+
+
+def test_transformation_columns_come_back_in_the_order_asked_for(config, data):
+    result = apply_transformation_from_config(config, data, columns=["total", "price"])
+    assert list(result.columns) == ["total", "price"]
+
+
+def test_check_configuration_accepts_valid_specs(config):
+    config["validation"]["columns"]["PRICE"]["functions"] = [{"range": [0, None]}]
+    assert check_configuration(config)
+
+
+@pytest.mark.parametrize("spec", [{}, {"regex": "("}, {"range": [1]}])
+def test_check_configuration_rejects_invalid_specs(config, spec):
+    config["validation"]["columns"]["PRICE"]["functions"] = [spec]
+    assert not check_configuration(config)
+    with pytest.raises(ValueError):
+        compile_config(config)
@@ -0,0 +1,87 @@
+import pytest
+
+from first_package import run_batch
+from first_package.batch import describe_result, find_files, process_file
+
+
+@pytest.fixture
+def folders(tmp_path):
+    """
+    Creates the folders process_file copies and writes files to
+    """
+    for name in ["pass", "reject", "output", "error"]:
+        (tmp_path / name).mkdir()
+    return tmp_path
+
+
+def test_process_file_copies_valid_files_to_pass(config, data, write_file, folders):
+    path = write_file(data)
+    result = process_file(
+        config, path, folders / "pass", folders / "reject", folders / "output"
+    )
+    assert result["pass"] and result["error"] is None
+    assert result["rows"] == 3
+    assert (folders / "pass" / path.name).exists()
+    assert (folders / "output" / "supplier.csv").exists()
+    assert "pass" in describe_result(result)
+
+
+def test_process_file_copies_invalid_files_to_reject(config, data, write_file, folders):
+    data.loc[0, "PRICE"] = "x"
+    path = write_file(data)
+    result = process_file(config, path, folders / "pass", folders / "reject")
+    assert not result["pass"] and result["error"] is None
+    assert (folders / "reject" / path.name).exists()
+
+
+def test_process_file_copies_files_which_cant_be_transformed_to_error(
+    config, data, write_file, folders
+):
+    def fail(price, decimal_place):
+        raise RuntimeError("boom")
+
+    config["transformation"]["columns"]["price"][0]["function"] = fail
+    path = write_file(data)
+    result = process_file(
+        config, path, folders / "pass", folders / "reject", error_dir=folders / "error"
+    )
+    assert result["pass"]
+    assert result["error"] == "RuntimeError: boom"
+    assert (folders / "error" / path.name).exists()
+    assert not (folders / "pass" / path.name).exists()
+    assert "error" in describe_result(result)
+
+
+def test_process_file_copies_files_which_cant_be_validated_to_error(
+    config, data, write_file, folders
+):
+    def fail(value):
+        raise RuntimeError("boom")
+
+    config["validation"]["columns"]["PRICE"]["functions"] = [fail]
+    path = write_file(data)
+    result = process_file(
+        config, path, folders / "pass", folders / "reject", error_dir=folders / "error"
+    )
+    assert not result["pass"]
+    assert result["error"] == "RuntimeError: boom"
+    assert (folders / "error" / path.name).exists()
+    assert not (folders / "reject" / path.name).exists()
+
+
+def test_find_files_finds_the_largest_first(data, write_file):
+    small = write_file(data.head(1), "small.csv")
+    large = write_file(data, "large.csv")
+    assert find_files(small.parent) == [large, small]
+    assert find_files(small.parent, "small*") == [small]
+
+
+def test_run_batch_summarises_the_files(config, data, write_file, tmp_path):
+    write_file(data, "good.csv")
+    data.loc[0, "PRICE"] = "x"
+    write_file(data, "bad.csv")
+    summary = run_batch(
+        config, tmp_path / "inbox", tmp_path / "pass", tmp_path / "reject"
+    )
+    assert (summary["passed"], summary["rejected"], summary["errors"]) == (1, 1, 0)
+    assert summary["rows"] == 6
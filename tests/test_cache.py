@@ -0,0 +1,48 @@
+import time
+
+import pandas as pd
+
+from first_package.cache import FileCache
+from first_package.loader import SourceFile
+
+
+def test_file_cache_stores_and_reads_back_data(tmp_path, data):
+    cache = FileCache(tmp_path / "cache")
+    cache.set("key", data, [("sheet", True, 3, 4)], list(data.columns))
+    cached, sheets, headings = cache.get("key")
+    pd.testing.assert_frame_equal(cached, data)
+    assert sheets[0].populated and headings == list(data.columns)
+
+
+def test_file_cache_key_depends_on_the_contents_and_options(tmp_path, data, write_file):
+    cache = FileCache(tmp_path / "cache")
+    first = write_file(data, "first.csv")
+    second = write_file(data, "second.csv")
+    assert cache.key(first) == cache.key(second)
+    assert cache.key(first) != cache.key(first, {"sep": ";"})
+    write_file(data.head(1), "second.csv")
+    assert cache.key(first) != cache.key(second)
+
+
+def test_file_cache_removes_the_least_recently_used(tmp_path, data):
+    cache = FileCache(tmp_path / "cache")
+    cache.set("a", data, [], [])
+    size = sum(p.stat().st_size for p in cache.paths("a"))
+    cache.max_bytes = size * 2 + 1
+    # Leave time between each use, as file times can be coarse
+    time.sleep(0.05)
+    cache.set("b", data, [], [])
+    time.sleep(0.05)
+    cache.get("a")
+    cache.set("c", data, [], [])
+    assert not cache.paths("b")[0].exists()
+    assert cache.paths("a")[0].exists() and cache.paths("c")[0].exists()
+
+
+def test_source_file_uses_the_cache(tmp_path, config, data, write_file):
+    cache = FileCache(tmp_path / "cache")
+    path = write_file(data)
+    first = SourceFile(path, config, cache=cache)
+    second = SourceFile(path, config, cache=cache)
+    pd.testing.assert_frame_equal(first.data, second.data)
+    assert len(list((tmp_path / "cache").glob("*.feather"))) == 1
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from first_package import (
+    apply_transformation_from_chunks,
+    get_numeric_series,
+    get_row_number,
+)
+
+
+@pytest.fixture
+def config():
+    def same(values):
+        return values
+
+    def column(function, data, functiontype="series"):
+        return [
+            {
+                "function": function,
+                "data": data,
+                "functiontype": functiontype,
+                "kwargs": {},
+            }
+        ]
+
+    return {
+        "transformation": {
+            "columns": {
+                "row": column(get_row_number, [], "dataframe"),
+                "qty": column(same, ["QTY"]),
+                "desc": column(same, ["DESC"]),
+            }
+        }
+    }
+
+
+@pytest.fixture
+def chunks():
+    # The first chunk has whole numbers and no descriptions
+    return [
+        pd.DataFrame({"QTY": [1, 2], "DESC": [None, None]}),
+        pd.DataFrame({"QTY": [3.0, np.nan], "DESC": ["a", "b"]}, index=[2, 3]),
+    ]
+
+
+def test_row_numbers_carry_on_across_chunks(config, chunks, tmp_path):
+    path = tmp_path / "out.csv"
+    result = apply_transformation_from_chunks(config, chunks, path)
+    assert result["rows_in"] == result["rows_out"] == 4
+    assert pd.read_csv(path)["row"].tolist() == [1, 2, 3, 4]
+
+
+def test_chunks_are_written_to_csv_as_they_are(config, chunks, tmp_path):
+    path = tmp_path / "out.csv"
+    apply_transformation_from_chunks(config, chunks, path)
+    assert path.read_text().splitlines() == [
+        "row,qty,desc",
+        "1,1,",
+        "2,2,",
+        "3,3.0,a",
+        "4,,b",
+    ]
+
+
+def test_chunks_are_written_to_parquet_with_the_same_types(config, chunks, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "out.parquet"
+    apply_transformation_from_chunks(config, chunks, path, row_group_size=3)
+    result = pd.read_parquet(path)
+    assert result["row"].tolist() == [1, 2, 3, 4]
+    assert result["qty"].fillna(-1).tolist() == [1, 2, 3, -1]
+    assert result["desc"].tolist() == [None, None, "a", "b"]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+@pytest.mark.parametrize("row_group_size", [1, 2, 100])
+def test_whole_numbers_become_decimals_when_a_later_chunk_needs_them(
+    tmp_path, suffix, row_group_size
+):
+    pytest.importorskip("pyarrow")
+    config = {
+        "transformation": {
+            "columns": {
+                "qty": [
+                    {
+                        "function": get_numeric_series,
+                        "data": ["QTY"],
+                        "functiontype": "series",
+                        "kwargs": {},
+                    }
+                ]
+            }
+        }
+    }
+    chunks = [
+        pd.DataFrame({"QTY": ["1", "2"]}),
+        pd.DataFrame({"QTY": ["2.5", "3"]}, index=[2, 3]),
+        pd.DataFrame({"QTY": ["4", None]}, index=[4, 5]),
+    ]
+    path = tmp_path / f"out{suffix}"
+    result = apply_transformation_from_chunks(
+        config, chunks, path, row_group_size=row_group_size
+    )
+    assert result["rows_out"] == 6
+    if suffix == ".csv":
+        qty = pd.read_csv(path)["qty"]
+    else:
+        qty = pd.read_parquet(path)["qty"]
+        assert qty.dtype in ("float64", "Float64")
+    assert qty.fillna(-1).tolist() == [1, 2, 2.5, 3, 4, -1]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_chunks_which_dont_fit_the_first_are_an_error(config, chunks, tmp_path):
+    pytest.importorskip("pyarrow")
+    chunks[1]["QTY"] = ["x", "y"]
+    with pytest.raises(ValueError):
+        apply_transformation_from_chunks(config, chunks, tmp_path / "out.parquet")
+
+
+def test_the_parquet_file_is_closed_when_a_chunk_fails(config, chunks, tmp_path):
+    pytest.importorskip("pyarrow")
+
+    def failing():
+        yield chunks[0]
+        raise RuntimeError("boom")
+
+    path = tmp_path / "out.parquet"
+    with pytest.raises(RuntimeError):
+        apply_transformation_from_chunks(config, failing(), path)
+    # Only a closed file can be read
+    assert list(pd.read_parquet(path).columns) == ["row", "qty", "desc"]
+
+
+def test_an_empty_file_is_written_when_there_are_no_chunks(config, tmp_path):
+    path = tmp_path / "out.csv"
+    result = apply_transformation_from_chunks(config, [], path)
+    assert path.exists() and result["rows_out"] == 0
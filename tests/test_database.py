@@ -0,0 +1,148 @@
+import pickle
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+from first_package import ConnectionPool, load_dataframe, process_file, sqlite_pool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = sqlite_pool(tmp_path / "test.db")
+    yield pool
+    pool.close()
+
+
+def read_table(pool, table):
+    with pool.connection() as connection:
+        return pd.read_sql(f"SELECT * FROM {table}", connection)
+
+
+def test_load_dataframe_creates_the_table_and_inserts_every_row(pool):
+    df = pd.DataFrame(
+        {
+            "name": ["a", None, "c"],
+            "qty": [1, 2, 3],
+            "price": [1.5, float("nan"), 2.0],
+            "date": pd.to_datetime(["2021-05-01", None, "2021-05-03"]),
+        }
+    )
+    assert load_dataframe(df, "items", pool, batch_size=2, create=True) == 3
+    result = read_table(pool, "items")
+    assert result["name"].tolist() == ["a", None, "c"]
+    assert result["qty"].tolist() == [1, 2, 3]
+    assert result["price"].isna().tolist() == [False, True, False]
+
+
+def test_load_dataframe_inserts_nothing_if_any_row_fails(pool):
+    with pool.connection() as connection:
+        connection.execute("CREATE TABLE items (qty INTEGER NOT NULL)")
+    df = pd.DataFrame({"qty": [1, None, 3]})
+    with pytest.raises(sqlite3.IntegrityError):
+        load_dataframe(df, "items", pool, batch_size=1)
+    assert len(read_table(pool, "items")) == 0
+
+
+def test_a_failed_load_doesnt_leave_the_table_it_created(pool):
+    # A list can't be stored, so the second batch fails
+    df = pd.DataFrame({"qty": [1, [2]]})
+    with pytest.raises(sqlite3.Error):
+        load_dataframe(df, "items", pool, batch_size=1, create=True)
+    with pool.connection() as connection:
+        tables = connection.execute("SELECT name FROM sqlite_master").fetchall()
+    assert tables == []
+
+
+def test_loads_at_the_same_time_wait_for_each_other(tmp_path):
+    path = tmp_path / "test.db"
+    df = pd.DataFrame({"qty": range(1000)})
+    load_dataframe(df.head(0), "items", sqlite_pool(path), create=True)
+    errors = []
+
+    def load():
+        # Each thread has its own pool, like separate processes do
+        try:
+            load_dataframe(df, "items", sqlite_pool(path, size=1))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(read_table(sqlite_pool(path), "items")) == 8000
+
+
+def test_pools_only_keep_their_settings_when_pickled(pool):
+    with pool.connection():
+        pass
+    copy = pickle.loads(pickle.dumps(pool))
+    assert copy.opened == 0 and copy.size == pool.size
+
+
+def test_connections_which_fail_to_open_dont_use_up_the_pool(tmp_path):
+    attempts = []
+
+    def connect():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return sqlite3.connect(tmp_path / "test.db")
+
+    pool = ConnectionPool(connect, size=1)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection():
+            pass
+    assert pool.opened == 0
+    with pool.connection(timeout=1) as connection:
+        connection.execute("SELECT 1")
+    assert pool.opened == 1
+
+
+def test_connections_are_closed_rather_than_reused_after_an_error(pool):
+    with pytest.raises(RuntimeError):
+        with pool.connection() as broken:
+            raise RuntimeError("boom")
+    with pytest.raises(sqlite3.ProgrammingError):
+        broken.execute("SELECT 1")
+    with pool.connection(timeout=1) as connection:
+        assert connection is not broken
+    assert pool.opened == 1
+
+
+def test_threads_waiting_for_a_connection_get_a_new_one_after_an_error(tmp_path):
+    pool = sqlite_pool(tmp_path / "test.db", size=1)
+    borrowed = []
+
+    def borrow():
+        with pool.connection(timeout=5) as connection:
+            borrowed.append(connection)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as broken:
+            thread = threading.Thread(target=borrow)
+            thread.start()
+            raise RuntimeError("boom")
+    thread.join()
+    assert len(borrowed) == 1 and borrowed[0] is not broken
+
+
+def test_process_file_can_create_the_table(config, data, write_file, tmp_path, pool):
+    for name in ["pass", "reject"]:
+        (tmp_path / name).mkdir()
+    path = write_file(data)
+    result = process_file(
+        config,
+        path,
+        tmp_path / "pass",
+        tmp_path / "reject",
+        pool=pool,
+        table="items",
+        create=True,
+    )
+    assert result["error"] is None
+    assert len(read_table(pool, "items")) == 3
@@ -0,0 +1,140 @@
+import datetime
+import time
+
+import pandas as pd
+import pytest
+
+from first_package import (
+    apply_transformation_from_config,
+    apply_validation_from_config,
+    check_eclass,
+    get_reference,
+    reference_data,
+    set_reference_file,
+)
+from first_package.incremental import RowStore, apply_incremental, hash_rows
+
+
+def doubled(rows, calls):
+    calls.append(len(rows))
+    return pd.DataFrame({"x": rows["a"] * 2}, index=rows.index)
+
+
+def test_hash_rows_ignores_the_index():
+    first = pd.DataFrame({"a": [1, 2]})
+    second = pd.DataFrame({"a": [1, 2]}, index=[5, 6])
+    assert hash_rows(first).tolist() == hash_rows(second).tolist()
+
+
+def test_only_new_rows_are_processed(tmp_path):
+    store = RowStore(tmp_path)
+    calls = []
+    apply_incremental(
+        store, "k", "t", pd.DataFrame({"a": [1, 2, 2]}), lambda r: doubled(r, calls)
+    )
+    data = pd.DataFrame({"a": [3, 1, 2]}, index=[7, 8, 9])
+    result = apply_incremental(store, "k", "t", data, lambda r: doubled(r, calls))
+    assert calls == [2, 1]
+    assert result["x"].tolist() == [6, 2, 4]
+    assert result.index.tolist() == [7, 8, 9]
+
+
+def test_results_are_added_as_parts_and_combined(tmp_path):
+    store = RowStore(tmp_path, max_rows=3, max_parts=3)
+    calls = []
+    for a in range(4):
+        data = pd.DataFrame({"a": [a]})
+        apply_incremental(store, "k", "t", data, lambda r: doubled(r, calls))
+    # The first three parts were combined, keeping the latest rows
+    assert len(store.parts("k", "t")) == 2
+    assert len(store.get("k", "t")) == 4
+    store.combine(store.path("k", "t"), store.parts("k", "t"))
+    assert len(store.get("k", "t")) == 3
+
+
+def test_the_least_recently_used_keys_are_evicted(tmp_path):
+    store = RowStore(tmp_path, max_keys=2)
+    data = pd.DataFrame({"a": [1]})
+    for key in ["a", "b", "c"]:
+        apply_incremental(store, key, "t", data, lambda r: doubled(r, []))
+        # Leave time between each use, as file times can be coarse
+        time.sleep(0.05)
+    assert store.get("a", "t") is None
+    assert store.get("c", "t") is not None
+    store.clear()
+    assert store.get("c", "t") is None
+
+
+@pytest.fixture
+def dated_config(config):
+    config["transformation"]["columns"]["date"] = [
+        {
+            "function": datetime.date.today,
+            "data": [],
+            "functiontype": "constant",
+            "kwargs": {},
+        }
+    ]
+    return config
+
+
+def test_transformation_with_a_store_gives_the_same_result(
+    dated_config, data, tmp_path
+):
+    store = RowStore(tmp_path)
+    expected = apply_transformation_from_config(dated_config, data)
+    for _ in range(2):
+        result = apply_transformation_from_config(dated_config, data, store=store)
+        pd.testing.assert_frame_equal(result, expected)
+    columns = ["date", "total", "row"]
+    result = apply_transformation_from_config(
+        dated_config, data, columns=columns, store=store
+    )
+    pd.testing.assert_frame_equal(result, expected[columns])
+
+
+def test_outputs_which_dont_depend_on_the_row_arent_stored(
+    dated_config, data, tmp_path
+):
+    store = RowStore(tmp_path)
+    apply_transformation_from_config(dated_config, data, store=store)
+    (path,) = [p for p in tmp_path.iterdir() if p.name.endswith("transformation")]
+    stored = pd.read_parquet(next(path.glob("*.parquet")))
+    assert sorted(stored.columns) == ["hash", "price", "total"]
+
+
+def test_validation_with_a_store_gives_the_same_result(config, data, tmp_path):
+    store = RowStore(tmp_path)
+    data.loc[1, "PRICE"] = "x"
+    for _ in range(2):
+        result = apply_validation_from_config(
+            config, data, "supplier.csv", return_result=True, store=store
+        )
+        assert not result
+        assert result.columns["PRICE"].mask().tolist() == [False, True, False]
+
+
+def test_validation_isnt_reused_once_the_reference_data_changes(
+    config, data, tmp_path, monkeypatch
+):
+    # Put back the default codes afterwards
+    monkeypatch.setitem(
+        reference_data.REFERENCE_DATA, "eclass", get_reference("eclass")
+    )
+    path = tmp_path / "eclass.csv"
+    pd.DataFrame({"code": ["ABC"]}).to_csv(path, index=False)
+    set_reference_file("eclass", path)
+    get_reference("eclass").check_interval = 0
+
+    config["validation"]["columns"]["eCLASS"] = {
+        "title": "eCLASS",
+        "functions": [check_eclass],
+        "threshold": 0,
+        "mandatory": True,
+    }
+    data["eCLASS"] = ["ABC", "ABC", "XYZ"]
+    store = RowStore(tmp_path / "store")
+    assert not apply_validation_from_config(config, data, "supplier.csv", store=store)
+
+    pd.DataFrame({"code": ["ABC", "XYZ"]}).to_csv(path, index=False)
+    assert apply_validation_from_config(config, data, "supplier.csv", store=store)
@@ -0,0 +1,121 @@
+import pandas as pd
+
+from first_package import (
+    apply_transformation_from_config,
+    apply_validation_from_config,
+    get_numeric_series,
+    strip_whitespace_series,
+)
+from first_package.loader import SourceFile, compact_dtypes
+from first_package.plan import get_numeric_columns
+
+
+def test_source_file_reads_the_whole_file_without_a_config(data, write_file):
+    source = SourceFile(write_file(data))
+    assert list(source.data.columns) == list(data.columns)
+    assert source.headings == list(data.columns)
+    assert len(source.sheets) == 1 and source.sheets[0].populated
+
+
+def test_source_file_reads_only_the_columns_a_config_uses(config, data, write_file):
+    data["UNUSED"] = "x"
+    source = SourceFile(write_file(data), config)
+    assert "UNUSED" not in source.data.columns
+    # The headings check still sees every column
+    assert source.headings == list(data.columns)
+
+
+def test_source_file_can_be_validated_without_reading_it_again(
+    config, data, write_file
+):
+    source = SourceFile(write_file(data), config)
+    source.path.unlink()
+    assert apply_validation_from_config(config, source)
+
+
+def test_compact_dtypes_keeps_integer_types():
+    data = compact_dtypes(pd.DataFrame({"QTY": [1, 2, 300]}))
+    assert data["QTY"].dtype == "int64"
+    assert (data["QTY"] * 1000).tolist() == [1000, 2000, 300000]
+
+
+def test_compact_dtypes_only_converts_the_numeric_columns_given():
+    df = pd.DataFrame({"CODE": ["007", "7", "10"], "QTY": ["1", "2", "3"]})
+    data = compact_dtypes(df, numeric_columns=["QTY"], max_unique_fraction=0)
+    assert data["CODE"].tolist() == ["007", "7", "10"]
+    assert data["QTY"].tolist() == [1, 2, 3]
+
+
+def test_compact_dtypes_leaves_columns_which_arent_all_numbers():
+    df = pd.DataFrame({"QTY": ["1", "x", None]})
+    data = compact_dtypes(df, numeric_columns=["QTY"], max_unique_fraction=0)
+    assert data["QTY"].tolist() == ["1", "x", None]
+
+
+def test_compact_dtypes_makes_repetitive_text_categorical():
+    data = compact_dtypes(pd.DataFrame({"UOM": ["BOX", "EACH"] * 10}))
+    assert isinstance(data["UOM"].dtype, pd.CategoricalDtype)
+
+
+def test_source_file_keeps_the_text_the_validators_check(config, data, write_file):
+    data["PRICE"] = ["007", "1.5", "2"]
+    source = SourceFile(write_file(data), config, dtype=str)
+    assert source.data["PRICE"].tolist() == ["007", "1.5", "2"]
+
+
+def test_compact_dtypes_only_shrinks_floats_which_dont_change():
+    df = pd.DataFrame({"QTY": [1.0, 2.5, None], "PRICE": [0.1, 2.0, 3.0]})
+    data = compact_dtypes(df, numeric_columns=["QTY", "PRICE"])
+    assert data["QTY"].dtype == "float32"
+    assert data["PRICE"].dtype == "float64"
+    assert compact_dtypes(df)["QTY"].dtype == "float64"
+
+
+def test_numeric_columns_are_those_only_used_by_numeric_transformations(config):
+    config["transformation"]["columns"]["discount"] = [
+        {
+            "function": get_numeric_series,
+            "data": ["DISCOUNT"],
+            "functiontype": "series",
+            "kwargs": {},
+        }
+    ]
+    config["transformation"]["columns"]["desc"] = [
+        {
+            "function": strip_whitespace_series,
+            "data": ["DESC"],
+            "functiontype": "series",
+            "kwargs": {},
+        }
+    ]
+    # The other columns are validated, so the validators need their text
+    assert get_numeric_columns(config) == {"DISCOUNT"}
+    config["transformation"]["columns"]["copy"] = [
+        {
+            "function": lambda df: df,
+            "data": [],
+            "functiontype": "dataframe",
+            "kwargs": {},
+        }
+    ]
+    assert get_numeric_columns(config) == set()
+
+
+def test_source_file_stores_the_numeric_columns_as_numbers(config, data, write_file):
+    config["transformation"]["columns"]["discount"] = [
+        {
+            "function": get_numeric_series,
+            "data": ["DISCOUNT"],
+            "functiontype": "series",
+            "kwargs": {},
+        }
+    ]
+    data["DISCOUNT"] = ["1", "0.5", None]
+    path = write_file(data)
+    source = SourceFile(path, config, dtype=str)
+    assert source.data["DISCOUNT"].dtype == "float32"
+    assert source.data["PRICE"].tolist() == ["1.50", "2", "3.25"]
+    expected = apply_transformation_from_config(config, SourceFile(path, dtype=str))
+    result = apply_transformation_from_config(config, source)
+    # The same numbers, in less space
+    assert result["discount"].astype(float).equals(expected["discount"])
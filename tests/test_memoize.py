@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from first_package.memoize import ResultCache, apply_unique, factorize
+
+
+def counted(function):
+    def wrapper(*args):
+        wrapper.calls += 1
+        return function(*args)
+
+    wrapper.calls = 0
+    return wrapper
+
+
+def test_apply_unique_calls_the_function_once_per_value():
+    function = counted(str.upper)
+    result = apply_unique(
+        function, [pd.Series(["a", "b", "a", "a"])], cache=ResultCache()
+    )
+    assert result.tolist() == ["A", "B", "A", "A"]
+    assert function.calls == 2
+
+
+def test_apply_unique_combines_several_columns():
+    function = counted(lambda a, b: f"{a}{b}")
+    columns = [pd.Series(["a", "a", "b"]), pd.Series([1, 2, 1])]
+    result = apply_unique(function, columns, cache=ResultCache())
+    assert result.tolist() == ["a1", "a2", "b1"]
+    assert function.calls == 3
+
+
+def test_apply_unique_keeps_the_index():
+    data = pd.Series(["a", "b"], index=[5, 7])
+    result = apply_unique(str.upper, [data], cache=ResultCache())
+    assert result.index.tolist() == [5, 7]
+
+
+def test_equal_values_of_different_types_dont_share_results():
+    cache = ResultCache()
+    data = pd.Series([1, True, 1.0, "1"], dtype=object)
+    assert apply_unique(repr, [data], cache=cache).tolist() == [
+        "1",
+        "True",
+        "1.0",
+        "'1'",
+    ]
+    # Nor through the cache
+    assert apply_unique(repr, [pd.Series([1.0])], cache=cache).tolist() == ["1.0"]
+
+
+def test_missing_values_are_found_in_the_cache():
+    cache = ResultCache()
+    function = counted(repr)
+    for _ in range(3):
+        apply_unique(function, [pd.Series([np.nan, "a"], dtype=object)], cache=cache)
+    assert function.calls == 2
+    assert len(cache.results) == 2
+
+
+def test_none_and_nan_are_kept_apart():
+    codes, uniques = factorize([pd.Series([np.nan, None, np.nan], dtype=object)])
+    assert codes.tolist() == [0, 1, 0]
+    assert len(uniques) == 2
+
+
+def test_unhashable_arguments_are_not_cached():
+    cache = ResultCache()
+    data = pd.Series(["a", "b"])
+    result = apply_unique(lambda v, items: v in items, [data], {"items": ["a"]}, cache)
+    assert result.tolist() == [True, False]
+    assert len(cache.results) == 0
+
+
+def test_result_cache_removes_the_least_recently_used():
+    cache = ResultCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert list(cache.results) == ["a", "c"]
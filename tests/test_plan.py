@@ -0,0 +1,89 @@
+import functools
+
+from first_package.plan import (
+    fingerprint,
+    get_plan,
+    get_required_columns,
+    prune_transformation,
+)
+
+
+def make_adder(amount):
+    def add(value):
+        return value + amount
+
+    return add
+
+
+def scale(value, factor=2):
+    return value * factor
+
+
+def column(function, data=("PRICE",)):
+    return {
+        "transformation": {
+            "columns": {
+                "out": [
+                    {
+                        "function": function,
+                        "data": list(data),
+                        "functiontype": "columns",
+                        "kwargs": {},
+                    }
+                ]
+            }
+        }
+    }
+
+
+def test_fingerprint_is_the_same_for_the_same_configuration(config):
+    assert fingerprint(config) == fingerprint(dict(config))
+
+
+def test_fingerprint_changes_with_the_values_a_function_encloses():
+    assert fingerprint(column(make_adder(1))) == fingerprint(column(make_adder(1)))
+    assert fingerprint(column(make_adder(1))) != fingerprint(column(make_adder(5)))
+
+
+def test_fingerprint_changes_with_defaults_and_partials():
+    def scale(value, factor=3):
+        return value * factor
+
+    assert fingerprint(column(globals()["scale"])) != fingerprint(column(scale))
+    assert fingerprint(column(functools.partial(scale, factor=2))) != fingerprint(
+        column(functools.partial(scale, factor=4))
+    )
+
+
+def test_fingerprint_changes_with_the_code_of_a_function():
+    def first(value):
+        return value + 1
+
+    def second(value):
+        return value - 1
+
+    second.__name__ = second.__qualname__ = first.__qualname__
+    assert fingerprint(column(first)) != fingerprint(column(second))
+
+
+def test_plans_are_only_reused_for_the_same_functions():
+    first = make_adder(1)
+    assert get_plan(column(first)) is get_plan(column(first))
+
+    # The same code and values, but a different function object
+    second = make_adder(1)
+    plan = get_plan(column(second))
+    assert plan.transformation.nodes[0].function is second
+
+
+def test_required_columns_include_only_what_is_used(config):
+    assert get_required_columns(config) == {"SUPPLIER", "DESC", "PRICE", "QTY"}
+    del config["validation"]
+    assert get_required_columns(config) == {"PRICE", "QTY"}
+
+
+def test_prune_transformation_keeps_the_nodes_needed(config):
+    plan = get_plan(config).transformation
+    pruned = prune_transformation(plan, ["total"])
+    assert [c for c, _ in pruned.outputs] == ["total"]
+    assert len(pruned.nodes) == 1
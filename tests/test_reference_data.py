@@ -0,0 +1,105 @@
+import os
+
+import pandas as pd
+import pytest
+
+from first_package import (
+    ReferenceSet,
+    get_reference,
+    reference_data,
+    set_reference_file,
+)
+from first_package.validators import check_eclass, check_eclass_series
+
+
+def write_codes(path, codes, mtime_ns=None):
+    """
+    Writes a file of codes, with an id column before the codes
+    """
+    df = pd.DataFrame({"id": range(len(codes)), "code": codes})
+    if path.suffix == ".parquet":
+        df.to_parquet(path)
+    else:
+        df.to_csv(path, index=False)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+@pytest.fixture
+def count_reads(monkeypatch):
+    """
+    Counts the number of times a reference file is read
+    """
+    reads = []
+    read_codes = ReferenceSet.read_codes
+
+    def counted(self):
+        reads.append(self.path)
+        return read_codes(self)
+
+    monkeypatch.setattr(ReferenceSet, "read_codes", counted)
+    return reads
+
+
+def test_codes_are_only_read_when_first_needed(tmp_path, count_reads):
+    codes = ReferenceSet(write_codes(tmp_path / "codes.csv", ["ABC"]), column="code")
+    assert codes.codes is None and count_reads == []
+    assert "ABC" in codes and "XYZ" not in codes
+    assert len(count_reads) == 1
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_csv_and_parquet_files_give_the_same_codes(tmp_path, suffix):
+    path = write_codes(tmp_path / f"codes{suffix}", ["ABC", "007", None, "ABC"])
+    codes = ReferenceSet(path, column="code").load()
+    assert codes.tolist() == ["ABC", "007"]
+
+
+def test_the_first_column_is_used_unless_a_column_is_given(tmp_path):
+    path = write_codes(tmp_path / "codes.csv", ["ABC", "ABD"])
+    assert ReferenceSet(path).load().tolist() == ["0", "1"]
+    assert ReferenceSet(path, column="code").load().tolist() == ["ABC", "ABD"]
+
+
+@pytest.mark.parametrize("change", ["mtime", "size"])
+def test_codes_are_read_again_when_the_file_changes(tmp_path, count_reads, change):
+    path = write_codes(tmp_path / "codes.csv", ["ABC"], mtime_ns=10**18)
+    codes = ReferenceSet(path, column="code", check_interval=0)
+    assert "ABC" in codes and "ABD" not in codes
+    assert "ABC" in codes and len(count_reads) == 1
+
+    if change == "mtime":
+        # The same size, so only the modified time shows the change
+        write_codes(path, ["ABD"], mtime_ns=2 * 10**18)
+    else:
+        write_codes(path, ["ABDE"], mtime_ns=10**18)
+    assert "ABC" not in codes
+    assert len(count_reads) == 2
+
+
+def test_the_file_is_only_checked_every_check_interval(tmp_path, count_reads):
+    path = write_codes(tmp_path / "codes.csv", ["ABC"])
+    codes = ReferenceSet(path, column="code", check_interval=3600)
+    assert "ABC" in codes
+    write_codes(path, ["ABDE"])
+    assert "ABC" in codes and len(count_reads) == 1
+    codes.check_interval = 0
+    assert "ABC" not in codes and "ABDE" in codes
+
+
+def test_eclass_validators_use_the_reference_file(tmp_path, monkeypatch):
+    # Put back the default codes afterwards
+    monkeypatch.setitem(
+        reference_data.REFERENCE_DATA, "eclass", get_reference("eclass")
+    )
+    data = pd.Series(["ABC", "XYZ", 123, None, "ABA"], dtype=object)
+    expected = data.map(check_eclass)
+    assert check_eclass_series(data).tolist() == expected.tolist()
+
+    set_reference_file(
+        "eclass", write_codes(tmp_path / "eclass.csv", ["XYZ", "123"]), "code"
+    )
+    expected = data.map(check_eclass)
+    assert expected.tolist() == [True, False, False, True, True]
+    assert check_eclass_series(data).tolist() == expected.tolist()
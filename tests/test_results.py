@@ -0,0 +1,42 @@
+import numpy as np
+
+from first_package import apply_transformation_from_config, apply_validation_from_config
+from first_package.results import ValidationResult, column_result
+
+
+def test_column_result_packs_the_invalid_rows():
+    invalid = np.array([True, False, False, True, False, False, False, False, True])
+    result = column_result(invalid, passed=False, mandatory=True)
+    assert result.invalid_count == 3 and result.total == 9
+    assert result.mask().tolist() == invalid.tolist()
+
+
+def test_invalid_rows_combine_the_mandatory_columns():
+    result = ValidationResult(3)
+    result.add_column("a", column_result([True, False, False], False, True))
+    result.add_column("b", column_result([False, True, False], True, False))
+    assert result.invalid_rows().tolist() == [True, False, False]
+    assert result.invalid_rows(["a", "b"]).tolist() == [True, True, False]
+    assert result.valid_rows().tolist() == [False, True, True]
+    assert result.counts() == {"a": 1, "b": 1}
+
+
+def test_validation_returns_the_invalid_rows(config, data):
+    data.loc[1, "PRICE"] = "x"
+    result = apply_validation_from_config(
+        config, data, "supplier.csv", return_result=True
+    )
+    assert not result
+    assert result.columns["PRICE"].mask().tolist() == [False, True, False]
+    # Columns which aren't mandatory are checked too
+    assert result.columns["DESC"].mask().tolist() == [False, True, False]
+    assert result.invalid_rows().tolist() == [False, True, False]
+
+
+def test_transformation_can_leave_out_the_invalid_rows(config, data):
+    data.loc[1, "PRICE"] = "x"
+    result = apply_validation_from_config(
+        config, data, "supplier.csv", return_result=True
+    )
+    transformed = apply_transformation_from_config(config, data, exclude=result)
+    assert transformed["price"].tolist() == [1.5, 3.25]
@@ -0,0 +1,41 @@
+import time
+
+import pandas as pd
+import pytest
+
+from first_package import apply_validation_from_config
+from first_package.stats import Stats
+from first_package.validators import check_empty, find_invalid, must_be_numeric
+
+
+def test_stats_add_up_each_call():
+    calls = []
+    stats = Stats(callback=lambda *args: calls.append(args))
+    stats.record("stage", 0.5, rows=10, invalid=1)
+    stats.since("stage", time.perf_counter(), rows=5)
+    assert stats.stages["stage"]["calls"] == 2
+    assert stats.stages["stage"]["rows"] == 15
+    assert stats.stages["stage"]["invalid"] == 1
+    assert len(calls) == 2
+    assert list(stats.to_frame().index) == ["stage"]
+    stats.clear()
+    assert stats.to_frame().empty
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_validator_stats_count_every_row(dtype):
+    stats = Stats()
+    data = pd.Series(["1", "1", "x", None, "1", "y"], dtype=dtype)
+    find_invalid(data, [check_empty, must_be_numeric], stats=stats)
+    assert stats.stages["validator.check_empty"]["rows"] == 6
+    assert stats.stages["validator.check_empty"]["invalid"] == 1
+    assert stats.stages["validator.must_be_numeric"]["rows"] == 5
+    assert stats.stages["validator.must_be_numeric"]["invalid"] == 2
+
+
+def test_file_checks_which_are_turned_off_arent_timed(config, data):
+    stats = Stats()
+    apply_validation_from_config(config, data, "supplier.csv", stats=stats)
+    assert "check_headings" in stats.stages
+    assert "check_filename" not in stats.stages
+    assert "column.PRICE" in stats.stages
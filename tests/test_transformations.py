@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from first_package.memoize import ResultCache
+from first_package.transformations import (
+    calculate_total,
+    calculate_total_series,
+    get_numeric,
+    get_numeric_series,
+    get_row_number,
+    identify_uom,
+    identify_uom_series,
+    remove_vat,
+    remove_vat_series,
+    strip_whitespace,
+    strip_whitespace_series,
+)
+
+VALUES = pd.Series([" 1.5 ", "2", "x", None, "3.14159", "", "-4"], dtype=object)
+UOMS = pd.Series(["Each", "BOX 2", "pair", "Box of 1", "box", None, "10 x 5"])
+
+
+def same(a, b):
+    """
+    Compares two sequences of results, treating missing values as equal
+    """
+    a = pd.Series(list(a), dtype=object).fillna("NaN")
+    b = pd.Series(list(b), dtype=object).fillna("NaN")
+    return a.tolist() == b.tolist()
+
+
+@pytest.mark.parametrize(
+    "function, series_function",
+    [
+        (strip_whitespace, strip_whitespace_series),
+        (remove_vat, remove_vat_series),
+        (get_numeric, get_numeric_series),
+    ],
+)
+def test_series_transformations_match_the_row_functions(function, series_function):
+    assert same(series_function(VALUES), VALUES.map(function))
+
+
+def test_get_numeric_series_rounds_like_get_numeric():
+    expected = VALUES.map(lambda v: get_numeric(v, decimal_place=2))
+    assert same(get_numeric_series(VALUES, decimal_place=2), expected)
+
+
+def test_calculate_total_series_matches_calculate_total():
+    qty = pd.Series(["4", None, "2", "1", "x", "3", "0.5"])
+    expected = [calculate_total(p, q) for p, q in zip(VALUES, qty)]
+    assert same(calculate_total_series(VALUES, qty), expected)
+
+
+def test_identify_uom_series_matches_identify_uom():
+    result = identify_uom_series(UOMS, lookup=ResultCache())
+    expected = [identify_uom(uom) for uom in UOMS]
+    assert same(result["uom_value"], [value for value, _ in expected])
+    assert same(result["uom_desc"].astype(object), [desc for _, desc in expected])
+
+
+def test_get_row_number_carries_on_from_an_offset():
+    df = pd.DataFrame({"a": range(3)})
+    assert list(get_row_number(df)) == [1, 2, 3]
+    assert list(get_row_number(df, row_offset=10)) == [11, 12, 13]
@@ -0,0 +1,133 @@
+import datetime
+import shutil
+
+import pandas as pd
+import pytest
+
+from first_package import utils
+from first_package.utils import (
+    get_date,
+    get_date_ddmmyyyy,
+    get_date_ddmmyyyy_series,
+    get_date_series,
+    probe_workbook,
+)
+
+DATES = pd.Series(
+    [
+        "31/12/1999",
+        "1999-12-31",
+        "1012000",
+        "311299",
+        "31 Dec 1999",
+        datetime.datetime(2001, 6, 15),
+        None,
+        "x",
+        "",
+    ],
+    dtype=object,
+)
+
+
+def same_dates(a, b):
+    """
+    Compares two sequences of dates, treating missing values as equal
+    """
+    return pd.to_datetime(pd.Series(list(a))).equals(pd.to_datetime(pd.Series(list(b))))
+
+
+@pytest.mark.parametrize("sample_size", [1, 1000])
+def test_get_date_series_matches_get_date(sample_size):
+    result = get_date_series(DATES, sample_size=sample_size)
+    assert same_dates(result, DATES.map(get_date))
+    assert result.index.equals(DATES.index)
+
+
+def test_get_date_series_reads_an_unambiguous_value_the_same_way_in_any_file():
+    # %d%m%y can't read 7 digits, so the most common format doesn't matter
+    assert get_date("1012000") == pd.Timestamp(2000, 1, 10)
+    for others in [["31121999", "15062001"], ["311299", "150601"]]:
+        result = get_date_series(pd.Series(others + ["1012000"]))
+        assert result.iloc[-1] == pd.Timestamp(2000, 1, 10)
+
+
+def test_get_date_series_reads_ambiguous_values_with_the_most_common_format(
+    monkeypatch,
+):
+    monkeypatch.setattr(utils, "DATE_FORMATS", ["%d%m%Y", "%m%d%Y"])
+    # Only the first two can be read month first
+    month_first = pd.Series(["12312000", "12302000", "01022000"])
+    day_first = pd.Series(["31122000", "30122000", "01022000"])
+    assert get_date_series(month_first).iloc[-1] == pd.Timestamp(2000, 1, 2)
+    assert get_date_series(day_first).iloc[-1] == pd.Timestamp(2000, 2, 1)
+
+
+def test_get_date_series_tries_the_other_formats_on_the_values_left_over():
+    data = pd.Series(["311299", "150601", "010203", "31/12/1999", "31 Dec 1999"])
+    result = get_date_series(data, sample_size=3)
+    assert result.tolist() == [
+        pd.Timestamp(1999, 12, 31),
+        pd.Timestamp(2001, 6, 15),
+        pd.Timestamp(2003, 2, 1),
+        pd.Timestamp(1999, 12, 31),
+        pd.Timestamp(1999, 12, 31),
+    ]
+
+
+def test_get_date_series_returns_datetime_columns_as_they_are():
+    data = pd.Series(pd.to_datetime(["2000-01-01", None]))
+    assert get_date_series(data) is data
+    assert get_date_ddmmyyyy_series(data) is data
+
+
+def test_get_date_ddmmyyyy_series_matches_get_date_ddmmyyyy():
+    result = get_date_ddmmyyyy_series(DATES)
+    assert same_dates(result, DATES.map(get_date_ddmmyyyy))
+    # Datetimes are kept, and only dd/mm/yyyy strings are read
+    assert result.notna().tolist() == [True] + [False] * 4 + [True] + [False] * 3
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """
+    Writes a workbook with a sheet for each of the ways a sheet can be
+    laid out, and returns its path
+    """
+    openpyxl = pytest.importorskip("openpyxl")
+    sheets = {
+        "data": [["SUPPLIER", "PRICE"], ["Acme", 1.5]],
+        "headings": [["SUPPLIER", "PRICE"]],
+        "blank": [],
+        "leading blank rows": [[None, None], [None, None], ["SUPPLIER"], ["Acme"]],
+        # pd.read_excel takes the blank row as the headings
+        "blank row before the headings": [[None], ["SUPPLIER", "PRICE"]],
+        "blank rows after the headings": [["SUPPLIER"], [None], [None]],
+        "blank text": [["SUPPLIER"], [""]],
+        "formulas": [["PRICE", "TOTAL"], [1.5, "=A2*2"]],
+        "only formulas": [["TOTAL"], ["=1+1"]],
+    }
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        worksheet = wb.create_sheet(name)
+        for row in rows:
+            worksheet.append(row)
+    path = tmp_path / "workbook.xlsx"
+    wb.save(path)
+    return path
+
+
+# pandas picks the reader from the contents rather than the extension,
+# so a copy with the old extension uses the fallback without xlrd
+@pytest.mark.parametrize("suffix", [".xlsx", ".xls"])
+def test_probe_workbook_matches_read_excel(workbook, suffix):
+    path = workbook.with_suffix(suffix)
+    if suffix != workbook.suffix:
+        shutil.copy(workbook, path)
+    sheets = probe_workbook(path)
+    expected = pd.read_excel(workbook, sheet_name=None)
+    assert [s.name for s in sheets] == list(expected)
+    assert {s.name: s.populated for s in sheets} == {
+        name: len(df) > 0 for name, df in expected.items()
+    }
+    assert sheets[0].populated and not sheets[1].populated
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from first_package.validators import (
+    SERIES_VALIDATORS,
+    SpecValidator,
+    check_column,
+    check_empty,
+    check_rule,
+    compile_validator,
+    dates_out_of_order_series,
+    find_invalid,
+    find_rule_invalid,
+    must_be_numeric,
+    not_zero_pound_penny,
+    total_outside_variance_series,
+)
+
+VALUES = ["1.50", "0", "abc", None, " 3 ", "0.01", "1", "", np.nan, "1e3", "£2"]
+
+
+@pytest.mark.parametrize("function", list(SERIES_VALIDATORS))
+def test_series_validators_match_the_cell_functions(function):
+    data = pd.Series(VALUES, dtype=object)
+    expected = data.map(function).astype(bool).tolist()
+    assert SERIES_VALIDATORS[function](data).astype(bool).tolist() == expected
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+@pytest.mark.parametrize("memoize", [False, True])
+def test_find_invalid_matches_checking_each_value(dtype, memoize):
+    data = pd.Series(VALUES, dtype=dtype)
+    functions = [check_empty, must_be_numeric, not_zero_pound_penny]
+    expected = pd.Series(VALUES, dtype=object).map(
+        lambda value: any(f(value) for f in functions)
+    )
+    result = find_invalid(data, functions, memoize=memoize)
+    assert result.tolist() == expected.tolist()
+    assert result.index.equals(data.index)
+
+
+def test_find_invalid_only_checks_values_which_havent_failed():
+    seen = []
+
+    def record(value):
+        seen.append(value)
+        return False
+
+    find_invalid(pd.Series(["a", None, "b"]), [check_empty, record])
+    assert seen == ["a", "b"]
+
+
+def test_check_column_uses_the_threshold():
+    data = pd.Series(["1", "2", "x", "y"])
+    assert check_column(data, [must_be_numeric], 0.5)
+    assert not check_column(data, [must_be_numeric], 0.25)
+
+
+def test_rules_find_the_rows_which_break_them():
+    data = pd.DataFrame(
+        {"PRICE": ["1", "2", "x"], "QTY": ["2", "2", "1"], "TOTAL": ["2", "9", "1"]}
+    )
+    invalid = find_rule_invalid(data, total_outside_variance_series)
+    # Values which aren't numbers are left to the column validators
+    assert invalid.tolist() == [False, True, False]
+    assert not check_rule(data, total_outside_variance_series, 0.2)
+    assert check_rule(data, total_outside_variance_series, 0.5)
+
+
+def test_dates_out_of_order_series():
+    earlier = pd.Series(["01/05/2021", "03/05/2021", "01/05/2021"])
+    later = pd.Series(["02/05/2021", "02/05/2021", "01/05/2021"])
+    assert dates_out_of_order_series(earlier, later).tolist() == [False, True, False]
+    assert dates_out_of_order_series(earlier, later, allow_equal=False).tolist() == [
+        False,
+        True,
+        True,
+    ]
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ({"regex": r"^\d+$"}, [False, True, True, False, True]),
+        ({"range": [1, 10]}, [False, True, True, True, True]),
+        ({"range": [None, 10]}, [False, True, True, False, True]),
+        ({"in_set": [1, "x"]}, [False, False, True, True, True]),
+        ({"max_length": 1}, [False, False, True, False, True]),
+    ],
+)
+def test_spec_validators(spec, expected):
+    data = pd.Series(["1", "x", "12.5", "0", None], dtype=object)
+    validator = SpecValidator(spec)
+    assert validator.series(data).tolist() == expected
+    assert data.map(validator).tolist() == expected
+
+
+def test_compile_validator_only_compiles_specs():
+    assert compile_validator(check_empty) is check_empty
+    assert isinstance(compile_validator({"regex": "a"}), SpecValidator)
+    with pytest.raises(ValueError):
+        compile_validator({})
+    with pytest.raises(ValueError):
+        compile_validator({"pattern": "a"})
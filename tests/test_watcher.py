@@ -0,0 +1,152 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import first_package.watcher
+from first_package.watcher import InboxWatcher
+
+
+@pytest.fixture
+def make_watcher(config, tmp_path):
+    def make(**options):
+        options = {"settle_seconds": 0, "poll_seconds": 0.01, **options}
+        return InboxWatcher(
+            config,
+            tmp_path / "inbox",
+            tmp_path / "pass",
+            tmp_path / "reject",
+            **options
+        )
+
+    return make
+
+
+def run(watcher, until, seconds=5, executor=None):
+    """
+    Runs a watcher in threads, or the executor given, until a condition is
+    met, or the seconds pass
+    """
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+
+        async def stop():
+            while not until() and loop.time() < deadline:
+                await asyncio.sleep(0.01)
+            watcher.stop()
+
+        if executor is not None:
+            await asyncio.gather(watcher.run(executor), stop())
+            return
+        with ThreadPoolExecutor(2) as threads:
+            await asyncio.gather(watcher.run(threads), stop())
+
+    asyncio.run(main())
+
+
+def test_files_are_processed_once(make_watcher, data, write_file, tmp_path):
+    path = write_file(data)
+    results = []
+    watcher = make_watcher(on_result=results.append)
+    run(watcher, lambda: results)
+    assert [r["pass"] for r in results] == [True]
+    assert (tmp_path / "pass" / path.name).exists()
+
+    # Nor again after a restart
+    watcher = make_watcher(on_result=results.append)
+    run(watcher, lambda: False, seconds=0.5)
+    assert len(results) == 1
+
+    # Unless the file is sent again
+    os.utime(path, ns=(0, 0))
+    watcher = make_watcher(on_result=results.append)
+    run(watcher, lambda: len(results) == 2)
+    assert len(results) == 2
+
+
+def test_files_which_arent_finished_are_left(make_watcher, data, write_file):
+    write_file(data)
+    watcher = make_watcher(settle_seconds=60)
+    assert watcher.find_ready() == []
+    assert watcher.find_ready() == []
+
+
+def test_files_with_errors_are_tried_again_then_left(
+    make_watcher, config, data, write_file, tmp_path
+):
+    def fail(price, decimal_place):
+        raise RuntimeError("boom")
+
+    config["transformation"]["columns"]["price"][0]["function"] = fail
+    path = write_file(data)
+    results = []
+    watcher = make_watcher(
+        retry_seconds=0.01,
+        max_attempts=3,
+        on_result=results.append,
+        error_dir=tmp_path / "error",
+    )
+    run(watcher, lambda: path in watcher.processed)
+    assert [r["error"] for r in results] == ["RuntimeError: boom"] * 3
+    assert watcher.failed == {}
+    assert (tmp_path / "error" / path.name).exists()
+    assert not (tmp_path / "pass" / path.name).exists()
+
+
+def test_files_which_cant_be_processed_are_tried_again_then_left(
+    make_watcher, data, write_file, monkeypatch
+):
+    path = write_file(data)
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(args)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(first_package.watcher, "process_file", fail)
+    watcher = make_watcher(retry_seconds=0.01, max_attempts=3)
+    run(watcher, lambda: path in watcher.processed)
+    assert len(calls) == 3
+    assert watcher.failed == {}
+
+
+def test_files_which_fail_wait_before_being_tried_again(
+    make_watcher, data, write_file, monkeypatch
+):
+    path = write_file(data)
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(args)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(first_package.watcher, "process_file", fail)
+    watcher = make_watcher(retry_seconds=60)
+    run(watcher, lambda: path in watcher.failed)
+    assert len(calls) == 1
+    assert watcher.find_ready() == []
+    assert path not in watcher.processed
+
+
+def test_a_broken_process_pool_is_replaced(make_watcher, data, write_file, tmp_path):
+    path = write_file(data)
+    broken = ProcessPoolExecutor(1)
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+
+    results = []
+    watcher = make_watcher(max_workers=1, retry_seconds=0.01, on_result=results.append)
+    run(watcher, lambda: results, seconds=30, executor=broken)
+    assert watcher.executor is not broken
+    assert [r["pass"] for r in results] == [True]
+    assert (tmp_path / "pass" / path.name).exists()
+    broken.shutdown()
+
+
+def test_the_state_file_is_written_next_to_the_inbox(make_watcher, tmp_path):
+    watcher = make_watcher()
+    assert watcher.state_file == tmp_path / ".inbox.processed.json"